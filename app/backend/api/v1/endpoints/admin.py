@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from app.services import statistics_service, admin_service
-from app.core.security import get_current_active_admin
+from app.dependencies import get_current_active_admin
 from app.crud.user import user as crud_user
 from app.crud.course import course as crud_course
-from app.db.dependencies import get_db
+from app.crud.file import file_blob as crud_file_blob
+from app.crud.statistics import stats_rollup
+from app.core.cache import get_cache_stats
+from app.core.database import get_pool_stats
+from app.core.security import get_password_hash_stats
+from app.core.database import get_db
 from app.models.user import User
 from app.schemas.admin import (
     SystemStats,
@@ -21,10 +26,38 @@ router = APIRouter()
 
 @router.get("/stats", response_model=SystemStats)
 async def get_system_stats(
+    current_user: User = Depends(get_current_active_admin),
+):
+    return await statistics_service.get_system_stats()
+
+
+@router.get("/db/pool", response_model=Dict[str, Any])
+async def get_db_pool_stats(
+    current_user: User = Depends(get_current_active_admin),
+):
+    return get_pool_stats()
+
+
+@router.get("/cache", response_model=Dict[str, Any])
+async def get_caches_stats(
+    current_user: User = Depends(get_current_active_admin),
+):
+    return get_cache_stats()
+
+
+@router.get("/auth/hashing", response_model=Dict[str, Any])
+async def get_password_hashing_stats(
+    current_user: User = Depends(get_current_active_admin),
+):
+    return get_password_hash_stats()
+
+
+@router.get("/storage", response_model=Dict[str, Any])
+async def get_storage_stats(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_admin),
 ):
-    return await statistics_service.get_system_stats(db)
+    return await crud_file_blob.get_stats(db)
 
 
 @router.get("/users/activity", response_model=List[UserActivityReport])
@@ -44,6 +77,16 @@ async def get_courses_report(
     return await statistics_service.get_courses_report(db)
 
 
+@router.post("/stats/rebuild", response_model=Dict[str, int])
+async def rebuild_stats_rollup(
+    course_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_admin),
+):
+    rebuilt = await stats_rollup.rebuild(db, course_id=course_id)
+    return {"courses_rebuilt": rebuilt}
+
+
 @router.post("/backup", response_model=BackupResponse)
 async def create_backup(
     backup_request: BackupRequest,
@@ -1,11 +1,25 @@
+from datetime import datetime, timezone
+
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.config import settings
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    get_password_hash,
+    revocations,
+    revoke_tokens,
+    verify_and_update_password,
+)
 from app.crud.user import user as crud_user
-from app.db.dependencies import get_db
-from app.schemas.token import Token
+from app.core.database import get_db
+from app.dependencies import optional_oauth2_scheme
+from app.schemas.base import RefreshTokenRequest, Token
 from app.schemas.user import UserCreate, UserInDB, UserOut
 
 router = APIRouter()
@@ -25,7 +39,7 @@ async def register(
         )
     
     # Hash password
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await get_password_hash(user_in.password)
     user_in_db = UserInDB(**user_in.dict(), password_hash=hashed_password)
     
     # Create user
@@ -38,10 +52,11 @@ async def login(
     db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
-    user = await crud_user.authenticate(
-        db, email=form_data.username, password=form_data.password
+    user = await crud_user.get_by_email(db, email=form_data.username)
+    valid, new_hash = await verify_and_update_password(
+        form_data.password, user.password_hash if user else None
     )
-    if not user:
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -52,9 +67,87 @@ async def login(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user",
         )
+    if new_hash:
+        # Stored hash uses outdated cost parameters, upgrade it while the password is at hand
+        await crud_user.update(db, db_obj=user, obj_in={"password_hash": new_hash})
+    
+    return _issue_tokens(user)
+
+
+def _issue_tokens(user) -> dict:
+    if not settings.AUTH_STATELESS:
+        access_token = create_access_token(subject=str(user.id))
+        return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": create_access_token(subject=str(user.id), user=user),
+        "refresh_token": create_refresh_token(subject=str(user.id)),
+        "token_type": "bearer",
+    }
+
+
+def _decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        payload = None
+    if not payload or payload.get("type") != "refresh" or revocations.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_token(
+    token_in: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    payload = _decode_refresh_token(token_in.refresh_token)
+    user = await crud_user.get(db, id=int(payload["sub"]))
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    access_token = create_access_token(subject=str(user.id))
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Refresh tokens are single use, the new pair carries the current role;
+    # of concurrent requests with the same token only the first consumes it
+    consumed = await revoke_tokens(
+        db, jti=payload["jti"], expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc)
+    )
+    if not consumed:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _issue_tokens(user)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token_in: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db),
+    access_token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    payload = _decode_refresh_token(token_in.refresh_token)
+    await revoke_tokens(
+        db, jti=payload["jti"], expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc)
+    )
+    # The access token sent along stops working now rather than at its expiry
+    access = None
+    if access_token:
+        try:
+            access = jwt.decode(access_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            pass
+    if access and access.get("sub") == payload["sub"] and access.get("jti"):
+        await revoke_tokens(
+            db, jti=access["jti"], expires_at=datetime.fromtimestamp(access["exp"], timezone.utc)
+        )
 
 
 @router.post("/password-recovery/{email}")
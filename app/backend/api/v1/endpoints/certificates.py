@@ -1,34 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from sqlalchemy.future import select
+from typing import List, Optional
 from pathlib import Path
 
 from app.crud.enrollment import enrollment as crud_enrollment
 from app.services import certificate_service, notification_service
 from app.core.config import settings
-from app.core.security import get_current_active_user
+from app.dependencies import get_current_active_user
+from app.core.storage import storage
 from app.crud.certificate import certificate as crud_certificate
-from app.db.dependencies import get_db
+from app.crud.user import user as crud_user
+from app.core.database import get_db
+from app.models.course import Certificate
 from app.models.user import User
+from app.schemas.base import PaginatedResponse
 from app.schemas.certificate import CertificateOut
+from app.utils.file_response import file_response
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[CertificateOut])
+@router.get("/", response_model=PaginatedResponse[CertificateOut])
 async def read_user_certificates(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    return await crud_certificate.get_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
+    try:
+        certificates, next_cursor = await crud_certificate.get_page(
+            db,
+            cursor=cursor,
+            limit=limit,
+            stmt=select(Certificate).filter(Certificate.user_id == current_user.id),
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return {"items": certificates, "next_cursor": next_cursor}
 
 
-@router.get("/{certificate_id}", response_class=FileResponse)
+@router.get("/{certificate_id}")
 async def download_certificate(
     certificate_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -38,14 +54,28 @@ async def download_certificate(
     if certificate.user_id != current_user.id and current_user.role not in ["teacher", "admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    file_path = Path(certificate.file_path)
-    if not file_path.exists():
+    filename = f"certificate_{certificate.course.title.replace(' ', '_')}.pdf"
+    # Certificates issued before the storage backend keep an absolute path on disk
+    if Path(certificate.file_path).is_absolute():
+        file_path = Path(certificate.file_path)
+        accel_uri = f"{settings.CERTIFICATES_ACCEL_PREFIX}{file_path.name}"
+    else:
+        url = storage.presigned_get_url(
+            certificate.file_path, filename=filename, media_type="application/pdf"
+        )
+        if url:
+            return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        file_path = storage.local_path(certificate.file_path)
+        accel_uri = f"{settings.UPLOAD_ACCEL_PREFIX}{certificate.file_path}"
+    if not file_path or not file_path.exists():
         raise HTTPException(status_code=404, detail="Certificate file not found")
     
-    return FileResponse(
+    return file_response(
+        request,
         file_path,
         media_type="application/pdf",
-        filename=f"certificate_{certificate.course.title.replace(' ', '_')}.pdf"
+        filename=filename,
+        accel_uri=accel_uri,
     )
 
 
@@ -76,7 +106,9 @@ async def generate_certificate(
         )
     
     # Generate certificate
-    certificate_path = await certificate_service.generate_certificate(db, user=current_user, course=enrollment.course)
+    # The principal may come from token claims only, the certificate needs the full profile
+    user = await crud_user.get(db, id=current_user.id)
+    certificate_path = await certificate_service.generate_certificate(db, user=user, course=enrollment.course)
     
     # Send notification
     await notification_service.send_certificate_issued_notification(
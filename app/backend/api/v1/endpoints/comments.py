@@ -1,25 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from sqlalchemy.future import select
+from typing import List, Optional
 
-from app.core.security import get_current_active_user, get_current_active_teacher
+from app.dependencies import get_current_active_user, get_current_active_teacher
 from app.crud.comment import comment as crud_comment
 from app.crud.course import course as crud_course
-from app.db.dependencies import get_db
+from app.core.database import get_db, get_read_db
+from app.models.course import Comment
 from app.models.user import User
+from app.schemas.base import PaginatedResponse
 from app.schemas.comment import CommentOut, CommentCreate, CommentUpdate
 
 router = APIRouter()
 
 
-@router.get("/materials/{material_id}/comments", response_model=List[CommentOut])
+@router.get("/materials/{material_id}/comments", response_model=PaginatedResponse[CommentOut])
 async def read_material_comments(
     material_id: int,
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    return await crud_comment.get_by_material(db, material_id=material_id, skip=skip, limit=limit)
+    try:
+        comments, next_cursor = await crud_comment.get_page(
+            db,
+            cursor=cursor,
+            limit=limit,
+            stmt=select(Comment).filter(Comment.material_id == material_id),
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return {"items": comments, "next_cursor": next_cursor}
 
 
 @router.post("/materials/{material_id}/comments", response_model=CommentOut, status_code=status.HTTP_201_CREATED)
@@ -71,7 +83,7 @@ async def delete_comment(
     is_teacher = await crud_course.is_teacher_of_course(
         db, 
         user_id=current_user.id, 
-        course_id=db_comment.material.lesson.module.course_id
+        course_id=db_comment.course_id
     )
     if db_comment.author_id != current_user.id and not is_teacher and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
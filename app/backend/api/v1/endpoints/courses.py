@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional
 
 from app.schemas.course import CourseOut
-from app.core.security import get_current_active_user, get_current_active_teacher, get_current_active_admin
-from app.crud.course import course, module, lesson, material, task
-from app.db.dependencies import get_db
+from app.core.config import settings
+from app.dependencies import get_current_active_user, get_current_active_teacher, get_current_active_admin
+from app.crud.base import decode_cursor
+from app.crud.course import course, course_teacher, module, lesson, material, task
+from app.crud.user import user as crud_user
+from app.core.database import get_db, get_read_db
+from app.schemas.base import PaginatedResponse
 from app.models.user import User
+from app.services import course_service
+from app.utils.http_cache import cache_headers, is_not_modified, make_etag
 from app.schemas.course import (
     CourseCreate, CourseUpdate, CourseOut,
     ModuleCreate, ModuleUpdate, ModuleOut,
@@ -19,14 +26,28 @@ from app.schemas.course import (
 router = APIRouter()
 
 
-@router.get("/", response_model=List[CourseOut])
+@router.get("/", response_model=PaginatedResponse[CourseOut])
 async def read_courses(
-    skip: int = 0,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    courses = await course.get_multi_with_creator(db, skip=skip, limit=limit)
-    return courses
+    # A malformed cursor is a 400 even when the catalogue is unchanged
+    try:
+        last_id = decode_cursor(cursor) if cursor is not None else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    total, last_modified = await course.get_catalogue_version(db)
+    etag = make_etag("catalogue", last_id, limit, total, last_modified)
+    headers = cache_headers(etag, last_modified, settings.COURSES_HTTP_MAX_AGE)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    courses, next_cursor = await course.get_page_with_creator(db, cursor=cursor, limit=limit)
+    response.headers.update(headers)
+    return {"items": courses, "next_cursor": next_cursor}
 
 
 @router.post("/", response_model=CourseOut, status_code=status.HTTP_201_CREATED)
@@ -42,11 +63,30 @@ async def create_course(
 @router.get("/{course_id}", response_model=CourseOut)
 async def read_course(
     course_id: int,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    db_course = await course.get_with_details(db, id=course_id)
+    version_info = await course.get_version_info(db, id=course_id)
+    if not version_info:
+        raise HTTPException(status_code=404, detail="Course not found")
+    structure_version, creator_updated_at, last_modified = version_info
+
+    # Structure version is bumped on every outline write, including the course itself
+    etag = make_etag("course", course_id, structure_version, creator_updated_at)
+    headers = cache_headers(etag, last_modified, settings.COURSES_HTTP_MAX_AGE)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    db_course = await course_service.get_course_outline(
+        db,
+        course_id,
+        structure_version=structure_version,
+        creator_updated_at=creator_updated_at,
+    )
     if not db_course:
         raise HTTPException(status_code=404, detail="Course not found")
+    response.headers.update(headers)
     return db_course
 
 
@@ -62,7 +102,19 @@ async def update_course(
         raise HTTPException(status_code=404, detail="Course not found")
     if db_course.creator_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    return await course.update(db, db_obj=db_course, obj_in=course_in)
+    update_data = course_in.dict(exclude_unset=True)
+    if update_data.get("version") is None:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="Send the version of the course being edited",
+        )
+    try:
+        return await course.update(db, db_obj=db_course, obj_in=update_data)
+    except StaleDataError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Course was modified concurrently, reload and try again",
+        )
 
 
 @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -80,6 +132,50 @@ async def delete_course(
     return None
 
 
+# Course teachers endpoints
+@router.post("/{course_id}/teachers/{teacher_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def assign_course_teacher(
+    course_id: int,
+    teacher_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_teacher),
+):
+    db_course = await course.get(db, id=course_id)
+    if not db_course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if db_course.creator_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    teacher = await crud_user.get(db, id=teacher_id)
+    if not teacher or teacher.role != "teacher":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User is not a teacher")
+    if await course_teacher.get_by_course_and_teacher(db, course_id=course_id, teacher_id=teacher_id):
+        return None
+    # Through the CRUD, so the course's structure_version and cached outline move with it
+    await course_teacher.create(db, obj_in={"course_id": course_id, "teacher_id": teacher_id})
+    return None
+
+
+@router.delete("/{course_id}/teachers/{teacher_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_course_teacher(
+    course_id: int,
+    teacher_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_teacher),
+):
+    db_course = await course.get(db, id=course_id)
+    if not db_course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if db_course.creator_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    link = await course_teacher.get_by_course_and_teacher(
+        db, course_id=course_id, teacher_id=teacher_id
+    )
+    if not link:
+        raise HTTPException(status_code=404, detail="Teacher is not assigned to this course")
+    await course_teacher.remove(db, id=link.id)
+    return None
+
+
 # Modules endpoints
 @router.post("/{course_id}/modules", response_model=ModuleOut, status_code=status.HTTP_201_CREATED)
 async def create_module(
@@ -1,42 +1,178 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
+from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from app.core.security import get_current_active_user, get_current_active_teacher
-from app.db.dependencies import get_db
+from app.core.config import settings
+from app.core.storage import storage
+from app.dependencies import get_current_active_user, get_current_active_teacher
+from app.core.database import get_db
+from app.crud.file import upload_session as crud_upload_session
 from app.models.user import User
+from app.schemas.file import (
+    DirectUploadCreate,
+    DirectUploadOut,
+    StoredFileOut,
+    UploadSessionCreate,
+    UploadSessionOut,
+)
 from app.services.file import file_service
+from app.utils.file_utils import FileLockedError, FileTooLargeError
+from app.utils.file_response import file_response
 
 router = APIRouter()
 
 
-@router.post("/upload")
+@router.post("/upload", response_model=StoredFileOut)
 async def upload_file(
     file: UploadFile = File(...),
-    subdir: str = "",
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    file_path, error = await file_service.save_upload_file(file, subdir=subdir)
+    saved, error = await file_service.save_upload_file(db, file)
     if error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
-    return {"file_path": file_path}
+    return {"file_path": saved.path, "size": saved.size, "sha256": saved.sha256}
+
+
+# Direct uploads: the client PUTs the file to a presigned storage URL,
+# then completes so the blob gets referenced. Only for backends that presign.
+@router.post("/direct-uploads", response_model=DirectUploadOut)
+async def create_direct_upload(
+    upload_in: DirectUploadCreate,
+    current_user: User = Depends(get_current_active_user),
+):
+    file_path, presigned, error = await file_service.create_direct_upload(
+        current_user, filename=upload_in.filename, size=upload_in.size, sha256=upload_in.sha256
+    )
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+    if presigned is None:
+        return {"file_path": file_path}
+    upload_url, headers = presigned
+    return {"file_path": file_path, "upload_url": upload_url, "headers": headers}
+
+
+@router.post("/direct-uploads/complete", response_model=StoredFileOut)
+async def complete_direct_upload(
+    upload_in: DirectUploadCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    saved, error = await file_service.complete_direct_upload(
+        db, filename=upload_in.filename, size=upload_in.size, sha256=upload_in.sha256
+    )
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+    return {"file_path": saved.path, "size": saved.size, "sha256": saved.sha256}
+
+
+# Resumable uploads: create a session, PUT the body in pieces at the current
+# offset, ask for the offset after a dropped connection, then complete.
+async def get_upload_session(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    session = await crud_upload_session.get_active(db, id=upload_id, user_id=current_user.id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return session
+
+
+@router.post("/uploads", response_model=UploadSessionOut, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    session_in: UploadSessionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    session, error = await file_service.create_upload_session(
+        db, current_user, filename=session_in.filename, size=session_in.size
+    )
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+    return session
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionOut)
+async def read_upload_session(session=Depends(get_upload_session)):
+    return session
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionOut)
+async def upload_chunk(
+    offset: int,
+    request: Request,
+    session=Depends(get_upload_session),
+    db: AsyncSession = Depends(get_db),
+):
+    if offset != session.received:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is at offset {session.received}",
+            headers={"Upload-Offset": str(session.received)},
+        )
+    try:
+        received = await file_service.write_upload_chunk(db, session, offset, request.stream())
+    except FileLockedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    if received is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session changed, query its offset",
+        )
+    session.received = received
+    return session
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=StoredFileOut)
+async def complete_upload_session(
+    session=Depends(get_upload_session),
+    db: AsyncSession = Depends(get_db),
+):
+    saved, error = await file_service.complete_upload_session(db, session)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+    return {"file_path": saved.path, "size": saved.size, "sha256": saved.sha256}
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(
+    session=Depends(get_upload_session),
+    db: AsyncSession = Depends(get_db),
+):
+    await file_service.abort_upload_session(db, session)
+    return None
 
 
 @router.get("/download/{file_path:path}")
 async def download_file(
     file_path: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    full_path = file_service.get_file_path(file_path)
+    # Certificates have their own access checks, staging files are not served,
+    # only uploads something registered or still points at
+    key = file_service.normalize_key(file_path)
+    if key is None or not await file_service.is_servable(db, key):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    url = storage.presigned_get_url(key, filename=key.rsplit("/", 1)[-1])
+    if url:
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    full_path = file_service.get_file_path(key)
     if not full_path:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
+    return file_response(
+        request,
         full_path,
         filename=full_path.name,
+        accel_uri=f"{settings.UPLOAD_ACCEL_PREFIX}{key}",
     )
 
 
@@ -46,6 +182,12 @@ async def delete_file(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_teacher),
 ):
-    if not file_service.delete_file(file_path):
+    key = file_service.normalize_key(file_path)
+    if key is None:
+        raise HTTPException(status_code=404, detail="File not found or already deleted")
+    deleted, error = await file_service.delete_file(db, key)
+    if error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+    if not deleted:
         raise HTTPException(status_code=404, detail="File not found or already deleted")
     return None
\ No newline at end of file
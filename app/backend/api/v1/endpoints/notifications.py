@@ -1,27 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from sqlalchemy.future import select
+from typing import List, Optional
 
-from app.core.security import get_current_active_user
+from app.dependencies import get_current_active_user
 from app.crud.notification import notification as crud_notification
-from app.db.dependencies import get_db
+from app.core.database import get_db, get_read_db
+from app.models.notification import Notification
 from app.models.user import User
+from app.schemas.base import PaginatedResponse
 from app.schemas.notification import NotificationOut, NotificationUpdate
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[NotificationOut])
+@router.get("/", response_model=PaginatedResponse[NotificationOut])
 async def read_notifications(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
     unread_only: bool = False,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
+    stmt = select(Notification).filter(Notification.user_id == current_user.id)
     if unread_only:
-        return await crud_notification.get_unread_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-    return await crud_notification.get_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
+        stmt = stmt.filter(Notification.is_read == False)
+    try:
+        notifications, next_cursor = await crud_notification.get_page(
+            db, cursor=cursor, limit=limit, stmt=stmt, descending=True
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return {"items": notifications, "next_cursor": next_cursor}
 
 
 @router.get("/{notification_id}", response_model=NotificationOut)
@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 from typing import List
 
 from app.crud.course import course as crud_course
-from app.core.security import get_current_active_user, get_current_active_teacher
+from app.dependencies import get_current_active_user, get_current_active_teacher
 from app.crud.task import task as crud_task
 from app.crud.answer import answer as crud_answer
-from app.db.dependencies import get_db
+from app.core.database import get_db
 from app.models.user import User
 from app.schemas.task import TaskOut, TaskCreate, TaskUpdate
 from app.schemas.answer import AnswerOut, AnswerCreate, AnswerUpdate, AnswerGrade
+from app.services.file import file_service
 
 router = APIRouter()
 
@@ -46,7 +48,9 @@ async def create_answer(
     
     answer_in.task_id = task_id
     answer_in.student_id = current_user.id
-    return await crud_answer.create(db, obj_in=answer_in)
+    # Progress moves with the answer's score inside crud_answer.create
+    db_answer = await crud_answer.create(db, obj_in=answer_in)
+    return db_answer
 
 
 @router.post("/tasks/{task_id}/answers/upload", response_model=AnswerOut, status_code=status.HTTP_201_CREATED)
@@ -63,18 +67,19 @@ async def upload_answer_file(
     if db_task.task_type != "file_upload":
         raise HTTPException(status_code=400, detail="This task doesn't accept file uploads")
     
-    # Save file
-    file_path = f"uploads/answers/{task_id}_{current_user.id}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+    # Save file, resubmitting the same file reuses the stored blob
+    saved, error = await file_service.save_upload_file(db, file)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
     
     # Create answer record
     answer_in = AnswerCreate(
         task_id=task_id,
         student_id=current_user.id,
-        file_path=file_path,
+        file_path=saved.path,
     )
-    return await crud_answer.create(db, obj_in=answer_in)
+    db_answer = await crud_answer.create(db, obj_in=answer_in)
+    return db_answer
 
 
 @router.get("/answers/{answer_id}", response_model=AnswerOut)
@@ -107,10 +112,11 @@ async def grade_answer(
         raise HTTPException(status_code=404, detail="Answer not found")
     
     # Verify the teacher is assigned to this course
+    course_id = db_answer.course_id
     is_teacher = await crud_course.is_teacher_of_course(
         db, 
         user_id=current_user.id, 
-        course_id=db_answer.task.lesson.module.course_id
+        course_id=course_id
     )
     if not is_teacher and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -119,5 +125,14 @@ async def grade_answer(
         "score": grade.score,
         "teacher_id": current_user.id,
         "feedback": grade.feedback,
+        "version": grade.version,
     }
-    return await crud_answer.update(db, db_obj=db_answer, obj_in=update_data)
\ No newline at end of file
+    try:
+        db_answer = await crud_answer.update(db, db_obj=db_answer, obj_in=update_data)
+    except StaleDataError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Answer was modified concurrently, reload and try again",
+        )
+    # The score difference moved the student's progress in the same transaction
+    return db_answer
\ No newline at end of file
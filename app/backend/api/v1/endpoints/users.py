@@ -1,29 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from app.crud.teacher_profile import teacher_profile as crud_teacher_profile
 from app.crud.enrollment import enrollment as crud_enrollment
 from app.crud.course import course as crud_course
 from app.schemas.course import CourseOut
-from app.core.security import get_current_active_admin
+from app.core.config import settings
+from app.core.security import invalidate_principal, revoke_tokens
+from app.dependencies import get_current_active_admin
 from app.crud.user import user as crud_user
-from app.db.dependencies import get_db
+from app.core.database import get_db
+from app.schemas.base import PaginatedResponse
 from app.models.user import User
 from app.schemas.user import UserOut, UserUpdate, UserCreate, UserRoleUpdate
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[UserOut])
+@router.get("/", response_model=PaginatedResponse[UserOut])
 async def read_users(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_admin),
 ):
-    users = await crud_user.get_multi(db, skip=skip, limit=limit)
-    return users
+    try:
+        users, next_cursor = await crud_user.get_page(db, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return {"items": users, "next_cursor": next_cursor}
 
 
 @router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
@@ -63,7 +69,9 @@ async def update_user(
     user = await crud_user.get(db, id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return await crud_user.update(db, db_obj=user, obj_in=user_in)
+    user = await crud_user.update(db, db_obj=user, obj_in=user_in)
+    await invalidate_principal(user_id)
+    return user
 
 
 @router.put("/{user_id}/role", response_model=UserOut)
@@ -86,7 +94,12 @@ async def update_user_role(
                 detail="Teacher profile must be created first",
             )
     
-    return await crud_user.update(db, db_obj=user, obj_in=role_in)
+    user = await crud_user.update(db, db_obj=user, obj_in=role_in)
+    if settings.AUTH_STATELESS:
+        # Issued tokens still claim the old role
+        await revoke_tokens(db, user_id=user_id)
+    await invalidate_principal(user_id)
+    return user
 
 
 @router.put("/{user_id}/activate", response_model=UserOut)
@@ -98,7 +111,9 @@ async def activate_user(
     user = await crud_user.get(db, id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return await crud_user.update(db, db_obj=user, obj_in={"is_active": True})
+    user = await crud_user.update(db, db_obj=user, obj_in={"is_active": True})
+    await invalidate_principal(user_id)
+    return user
 
 
 @router.put("/{user_id}/deactivate", response_model=UserOut)
@@ -110,7 +125,10 @@ async def deactivate_user(
     user = await crud_user.get(db, id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return await crud_user.update(db, db_obj=user, obj_in={"is_active": False})
+    user = await crud_user.update(db, db_obj=user, obj_in={"is_active": False})
+    await revoke_tokens(db, user_id=user_id)
+    await invalidate_principal(user_id)
+    return user
 
 
 @router.get("/{user_id}/courses", response_model=List[CourseOut])
@@ -0,0 +1,22 @@
+# python -m app.commands.backfill_course_ids
+import asyncio
+
+from sqlalchemy.future import select
+
+from app.core.database import async_session
+from app.crud.course import sync_course_ids
+from app.models.course import Course, Module
+
+
+async def main() -> None:
+    async with async_session() as db:
+        course_ids = (await db.execute(select(Course.id).order_by(Course.id))).scalars().all()
+        # One transaction per course keeps locks and WAL bursts small on big tables
+        for number, course_id in enumerate(course_ids, start=1):
+            await sync_course_ids(db, Module.course_id == course_id)
+            await db.commit()
+            print(f"[{number}/{len(course_ids)}] course {course_id}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
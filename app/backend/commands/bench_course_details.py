@@ -0,0 +1,78 @@
+# python -m app.commands.bench_course_details [--course-id ID] [--runs N]
+# Times CRUDCourse.get_with_details (one SELECT per tree level) against the
+# previous single joined load of modules x lessons x (materials, tasks).
+# Without --course-id the course with the most materials and tasks is used.
+import argparse
+import asyncio
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from app.commands.benchmark import Timings
+from app.core.database import async_session, engine
+from app.crud.course import course as crud_course
+from app.models.course import Course, CourseTeacher, Lesson, LessonMaterial, Module, Task
+
+
+async def joined_get_with_details(db, id: int):
+    result = await db.execute(
+        select(Course)
+        .options(
+            joinedload(Course.creator),
+            joinedload(Course.modules).joinedload(Module.lessons).joinedload(Lesson.materials),
+            joinedload(Course.modules).joinedload(Module.lessons).joinedload(Lesson.tasks),
+            joinedload(Course.teachers).joinedload(CourseTeacher.teacher),
+        )
+        .filter(Course.id == id)
+    )
+    return result.scalars().unique().first()
+
+
+async def largest_course_id(db) -> int:
+    items = (
+        select(Module.course_id.label("course_id"))
+        .join(Lesson, Lesson.module_id == Module.id)
+        .join(LessonMaterial, LessonMaterial.lesson_id == Lesson.id)
+        .union_all(
+            select(Module.course_id)
+            .join(Lesson, Lesson.module_id == Module.id)
+            .join(Task, Task.lesson_id == Lesson.id)
+        )
+        .subquery()
+    )
+    result = await db.execute(
+        select(items.c.course_id).group_by(items.c.course_id).order_by(func.count().desc()).limit(1)
+    )
+    return result.scalar()
+
+
+async def main(course_id, runs: int) -> None:
+    async with async_session() as db:
+        if course_id is None:
+            course_id = await largest_course_id(db)
+        if course_id is None:
+            print("No course with materials or tasks to load")
+            return
+    print(f"Course {course_id}, {runs} run(s) per variant")
+
+    timings = Timings(engine)
+    variants = (
+        ("before: joined load", joined_get_with_details),
+        ("after: selectin per level", lambda db, id: crud_course.get_with_details(db, id=id)),
+    )
+    for label, load in variants:
+        for _ in range(runs):
+            # A fresh session each time, the identity map would otherwise serve repeats
+            async with async_session() as db:
+                with timings.measure(label):
+                    await load(db, course_id)
+    timings.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading a course with its outline")
+    parser.add_argument("--course-id", type=int, default=None, help="course to load")
+    parser.add_argument("--runs", type=int, default=50, help="loads per variant")
+    args = parser.parse_args()
+    asyncio.run(main(args.course_id, args.runs))
@@ -0,0 +1,127 @@
+# python -m app.commands.bench_course_stats [--course-id ID] [--runs N]
+# Times course statistics computed by the previous sequence of joined queries,
+# by the single CTE query and by the incrementally maintained rollup.
+# Without --course-id the course with the most answers is used.
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.future import select
+
+from app.commands.benchmark import Timings
+from app.core.database import async_session, engine
+from app.crud.statistics import statistics as crud_statistics, stats_rollup
+from app.models.course import Answer, Comment, Course, Enrollment, Lesson, LessonMaterial, Module, Task
+
+
+def _answers_of_course(stmt, course_id: int):
+    # Path from an answer to its course before course_id was denormalized
+    return (
+        stmt.join(Answer.task)
+        .join(Task.lesson)
+        .join(Lesson.module)
+        .join(Module.course)
+        .filter(Course.id == course_id)
+    )
+
+
+async def joined_course_stats(db, course_id: int):
+    now = datetime.now()
+    thirty_days_ago = now - timedelta(days=30)
+    seven_days_ago = now - timedelta(days=7)
+
+    total_students = (
+        await db.execute(select(func.count(Enrollment.id)).filter(Enrollment.course_id == course_id))
+    ).scalar()
+    active_students = (
+        await db.execute(
+            _answers_of_course(select(func.count(func.distinct(Answer.student_id))), course_id)
+            .filter(Answer.created_at >= thirty_days_ago)
+        )
+    ).scalar()
+    completion_rate = (
+        await db.execute(select(func.avg(Enrollment.progress)).filter(Enrollment.course_id == course_id))
+    ).scalar()
+    average_score = (
+        await db.execute(_answers_of_course(select(func.avg(Answer.score)), course_id))
+    ).scalar()
+    module_stats = (
+        await db.execute(
+            select(
+                Module.id,
+                Module.title,
+                func.count(func.distinct(Enrollment.user_id)),
+                func.avg(case((Enrollment.progress >= 80, 1), else_=0)),
+            )
+            .join(Module.course)
+            .join(Enrollment, Enrollment.course_id == Course.id)
+            .filter(Course.id == course_id)
+            .group_by(Module.id, Module.title)
+        )
+    ).all()
+    answers_submitted = (
+        await db.execute(
+            _answers_of_course(select(func.count(Answer.id)), course_id)
+            .filter(Answer.created_at >= seven_days_ago)
+        )
+    ).scalar()
+    comments_posted = (
+        await db.execute(
+            select(func.count(Comment.id))
+            .join(Comment.material)
+            .join(LessonMaterial.lesson)
+            .join(Lesson.module)
+            .join(Module.course)
+            .filter(and_(Course.id == course_id, Comment.created_at >= seven_days_ago))
+        )
+    ).scalar()
+    return (
+        total_students, active_students, completion_rate, average_score,
+        module_stats, answers_submitted, comments_posted,
+    )
+
+
+async def busiest_course_id(db) -> int:
+    result = await db.execute(
+        select(Answer.course_id)
+        .filter(Answer.course_id.isnot(None))
+        .group_by(Answer.course_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+    return result.scalar()
+
+
+async def main(course_id, runs: int) -> None:
+    async with async_session() as db:
+        if course_id is None:
+            course_id = await busiest_course_id(db)
+        if course_id is None:
+            print("No course with answers to measure")
+            return
+        if await stats_rollup.get_course_stats(db, course_id=course_id) is None:
+            print("Rollup missing, run app.commands.rebuild_stats_rollup to include it")
+    print(f"Course {course_id}, {runs} run(s) per variant")
+
+    timings = Timings(engine)
+    variants = (
+        ("before: joined queries", joined_course_stats),
+        ("after: single CTE query", crud_statistics._get_live_course_stats),
+        ("rollup", lambda db, id: stats_rollup.get_course_stats(db, course_id=id)),
+    )
+    async with async_session() as db:
+        for label, compute in variants:
+            for _ in range(runs):
+                with timings.measure(label):
+                    await compute(db, course_id)
+            await db.rollback()
+    timings.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark course statistics queries")
+    parser.add_argument("--course-id", type=int, default=None, help="course to compute statistics for")
+    parser.add_argument("--runs", type=int, default=50, help="computations per variant")
+    args = parser.parse_args()
+    asyncio.run(main(args.course_id, args.runs))
@@ -0,0 +1,94 @@
+# python -m app.commands.bench_crud_writes --user-id ID [--rows N]
+# Times CRUDBase.update/remove (one UPDATE/DELETE ... RETURNING) against the
+# previous load, update, commit, refresh / select, delete versions on scratch
+# notifications of the given user. The scratch rows are removed afterwards.
+import argparse
+import asyncio
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert
+from sqlalchemy.future import select
+
+from app.commands.benchmark import Timings
+from app.core.database import async_session, engine
+from app.crud.base import CRUDBase
+from app.models.notification import Notification
+
+crud_notification = CRUDBase(Notification)
+
+
+async def legacy_update(db, db_obj, obj_in):
+    obj_data = jsonable_encoder(db_obj)
+    for field in obj_data:
+        if field in obj_in:
+            setattr(db_obj, field, obj_in[field])
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj
+
+
+async def legacy_remove(db, id):
+    obj = await db.execute(select(Notification).filter(Notification.id == id))
+    obj = obj.scalars().first()
+    await db.delete(obj)
+    await db.commit()
+    return obj
+
+
+async def create_rows(db, user_id: int, rows: int):
+    result = await db.scalars(
+        insert(Notification).returning(Notification),
+        [
+            {
+                "user_id": user_id,
+                "title": "benchmark",
+                "message": "benchmark",
+                "notification_type": "system",
+                "is_read": False,
+            }
+            for _ in range(rows)
+        ],
+    )
+    created = result.all()
+    await db.commit()
+    return created
+
+
+async def main(user_id: int, rows: int) -> None:
+    timings = Timings(engine)
+    variants = (
+        ("before", legacy_update, legacy_remove),
+        (
+            "after",
+            lambda db, db_obj, obj_in: crud_notification.update(db, db_obj=db_obj, obj_in=obj_in),
+            lambda db, id: crud_notification.remove(db, id=id),
+        ),
+    )
+    async with async_session() as db:
+        for label, update, remove in variants:
+            notifications = await create_rows(db, user_id, rows)
+            try:
+                for notification in notifications:
+                    with timings.measure(f"{label}: update (mark as read)"):
+                        await update(db, notification, {"is_read": True})
+                for notification in notifications:
+                    with timings.measure(f"{label}: remove"):
+                        await remove(db, notification.id)
+            finally:
+                await db.rollback()
+                await db.execute(
+                    delete(Notification).where(
+                        Notification.id.in_([n.id for n in notifications])
+                    )
+                )
+                await db.commit()
+    timings.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark single-statement update/remove")
+    parser.add_argument("--user-id", type=int, required=True, help="owner of the scratch notifications")
+    parser.add_argument("--rows", type=int, default=500, help="rows updated and removed per variant")
+    args = parser.parse_args()
+    asyncio.run(main(args.user_id, args.rows))
@@ -0,0 +1,117 @@
+# python -m app.commands.bench_password_hashing [--rounds 10 12] [--runs N] [--requests N] [--concurrency N]
+# Times bcrypt hashing and verification per cost factor, then verifies
+# concurrently through the login thread pool to report throughput and
+# queue time at the configured PASSWORD_HASH_WORKERS. Finally repeats the
+# login storm with verification in the pool and inline on the event loop while
+# a probe times a 1ms sleep; its p99 above 1ms is the latency every other
+# endpoint gains during a burst of logins.
+import argparse
+import asyncio
+import time
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.commands.benchmark import Timings
+from app.core.config import settings
+from app.core.security import get_password_hash_stats, pwd_context, verify_and_update_password
+
+PASSWORD = "correct horse battery staple"
+# Sleep timed by the event loop probe and stand-in for the user lookup before verifying, in seconds
+PROBE_INTERVAL = 0.001
+LOOKUP_TIME = 0.001
+
+
+def bench_rounds(rounds, runs: int) -> None:
+    timings = Timings()
+    for cost in rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=cost)
+        hashed = context.hash(PASSWORD)
+        for _ in range(runs):
+            with timings.measure(f"hash rounds={cost}"):
+                context.hash(PASSWORD)
+            with timings.measure(f"verify rounds={cost}"):
+                context.verify(PASSWORD, hashed)
+    timings.report()
+
+
+async def bench_pool(requests: int, concurrency: int) -> None:
+    hashed = CryptContext(
+        schemes=["bcrypt"], bcrypt__rounds=settings.BCRYPT_ROUNDS
+    ).hash(PASSWORD)
+    timings = Timings()
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login(unknown: bool) -> None:
+        nonlocal rejected
+        async with semaphore:
+            name = "unknown e-mail" if unknown else "known e-mail"
+            try:
+                with timings.measure(f"pool verify, {name}"):
+                    await verify_and_update_password(PASSWORD, None if unknown else hashed)
+            except HTTPException:
+                rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login(number % 2 == 1) for number in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    timings.report()
+    stats = get_password_hash_stats()
+    print(
+        f"workers={stats['workers']} concurrency={concurrency} "
+        f"throughput={(requests - rejected) / elapsed:.1f}/s rejected={rejected} "
+        f"queue_avg={stats['queue_time_avg_ms']:.2f}ms hash_avg={stats['hash_time_avg_ms']:.2f}ms"
+    )
+
+
+async def bench_event_loop(requests: int, concurrency: int) -> None:
+    hashed = pwd_context.hash(PASSWORD)
+    timings = Timings()
+
+    async def pooled() -> None:
+        await verify_and_update_password(PASSWORD, hashed)
+
+    async def inline() -> None:
+        pwd_context.verify_and_update(PASSWORD, hashed)
+
+    for mode, verify in (("thread pool", pooled), ("inline", inline)):
+        semaphore = asyncio.Semaphore(concurrency)
+        running = True
+
+        async def login() -> None:
+            async with semaphore:
+                await asyncio.sleep(LOOKUP_TIME)
+                try:
+                    await verify()
+                except HTTPException:
+                    pass
+
+        async def probe() -> None:
+            # Stands in for a cheap endpoint, anything above PROBE_INTERVAL is time spent waiting for the loop
+            while running:
+                with timings.measure(f"loop probe, {mode}"):
+                    await asyncio.sleep(PROBE_INTERVAL)
+
+        probing = asyncio.create_task(probe())
+        with timings.measure(f"login storm, {mode}"):
+            await asyncio.gather(*(login() for _ in range(requests)))
+        running = False
+        await probing
+
+    timings.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark password hashing")
+    parser.add_argument(
+        "--rounds", type=int, nargs="+", default=[10, settings.BCRYPT_ROUNDS], help="bcrypt costs"
+    )
+    parser.add_argument("--runs", type=int, default=10, help="hashes and verifications per cost")
+    parser.add_argument("--requests", type=int, default=100, help="logins through the thread pool")
+    parser.add_argument("--concurrency", type=int, default=16, help="logins in flight at once")
+    args = parser.parse_args()
+    bench_rounds(args.rounds, args.runs)
+    asyncio.run(bench_pool(args.requests, args.concurrency))
+    asyncio.run(bench_event_loop(args.requests, args.concurrency))
@@ -0,0 +1,162 @@
+# python -m app.commands.bench_uploads [--size-mb N] [--requests N] [--concurrency N]
+# Sends chunked multipart uploads (no Content-Length) through
+# UploadSizeLimitMiddleware to a throwaway app, once reading each file into
+# memory and once streaming it with stream_upload_file, and reports
+# throughput and peak RSS growth. Finally checks that an oversized chunked
+# body is cut off with 413 close to the limit.
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import FastAPI, File, UploadFile
+
+from app.core.config import settings
+from app.utils.file_utils import UploadSizeLimitMiddleware, stream_upload_file
+
+BOUNDARY = "bench-upload-boundary"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+MB = 1024 * 1024
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE
+
+
+class PeakRSS:
+    """Highest resident set size sampled while the block runs, above the starting one."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.growth = 0
+
+    async def _sample(self, baseline: int) -> None:
+        while True:
+            self.growth = max(self.growth, rss() - baseline)
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.ensure_future(self._sample(rss()))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+
+
+def build_app(directory: Path) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware)
+
+    @app.post("/buffered")
+    async def buffered(file: UploadFile = File(...)):
+        data = await file.read()
+        (directory / uuid.uuid4().hex).write_bytes(data)
+        return {"size": len(data)}
+
+    @app.post("/streamed")
+    async def streamed(file: UploadFile = File(...)):
+        saved = await stream_upload_file(file, directory / uuid.uuid4().hex)
+        return {"size": saved.size}
+
+    return app
+
+
+def body_chunks(size: int, chunk_size: int):
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="bench.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    payload = os.urandom(chunk_size)
+    for start in range(0, size, chunk_size):
+        yield payload[:min(chunk_size, size - start)]
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def post(app: FastAPI, path: str, size: int, chunk_size: int):
+    # Drives the ASGI app directly, returns (status, bytes the app read)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"transfer-encoding", b"chunked"),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    chunks = body_chunks(size, chunk_size)
+    pending = next(chunks)
+    sent = 0
+    status = None
+
+    async def receive():
+        nonlocal pending, sent
+        if pending is None:
+            return {"type": "http.disconnect"}
+        body, pending = pending, next(chunks, None)
+        sent += len(body)
+        return {"type": "http.request", "body": body, "more_body": pending is not None}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status, sent
+
+
+async def run(path: str, app: FastAPI, size: int, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async def upload():
+        async with semaphore:
+            statuses.append((await post(app, path, size, settings.UPLOAD_CHUNK_SIZE))[0])
+
+    async with PeakRSS() as peak:
+        start = time.perf_counter()
+        await asyncio.gather(*(upload() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    failed = sum(1 for status in statuses if status != 200)
+    print(
+        f"{path:<10} size={size / MB:.1f}MB requests={requests} concurrency={concurrency} "
+        f"throughput={requests * size / MB / elapsed:8.1f}MB/s "
+        f"peak_rss_growth={peak.growth / MB:8.1f}MB failed={failed}"
+    )
+
+
+async def main(size_mb: float, requests: int, concurrency: int) -> None:
+    size = int(size_mb * MB)
+    with tempfile.TemporaryDirectory() as directory:
+        app = build_app(Path(directory))
+        for path in ("/buffered", "/streamed"):
+            await run(path, app, size, requests, concurrency)
+
+        oversized = settings.MAX_FILE_SIZE * 4
+        status, sent = await post(app, "/streamed", oversized, settings.UPLOAD_CHUNK_SIZE)
+        print(
+            f"oversized chunked body of {oversized / MB:.1f}MB: status={status}, "
+            f"read {sent / MB:.1f}MB before rejecting (limit {settings.MAX_FILE_SIZE / MB:.1f}MB)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark memory and throughput of uploads")
+    parser.add_argument("--size-mb", type=float, default=8, help="size of each uploaded file")
+    parser.add_argument("--requests", type=int, default=32, help="uploads per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="uploads in flight at once")
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.requests, args.concurrency))
@@ -0,0 +1,41 @@
+# Timing helpers shared by the bench_* commands
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+
+
+class Timings:
+    """Wall time and SQL statements per measured operation, grouped by name."""
+
+    def __init__(self, engine=None):
+        self.samples: Dict[str, List[Tuple[float, int]]] = {}
+        self.statements = 0
+        if engine is not None:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+    @contextmanager
+    def measure(self, name: str):
+        statements = self.statements
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.samples.setdefault(name, []).append((elapsed, self.statements - statements))
+
+    def report(self) -> None:
+        for name, samples in self.samples.items():
+            times = sorted(elapsed * 1000 for elapsed, _ in samples)
+            p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+            p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+            statements = sum(count for _, count in samples) / len(samples)
+            print(
+                f"{name:<36} n={len(times):<6} median={statistics.median(times):8.2f}ms "
+                f"p95={p95:8.2f}ms p99={p99:8.2f}ms max={times[-1]:8.2f}ms statements={statements:.1f}"
+            )
@@ -0,0 +1,74 @@
+# python -m app.commands.check_query_plans
+# EXPLAINs the hot lookups with sequential scans disabled; any Seq Scan left
+# in a plan means no index can serve that query. Exits non-zero on failure.
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from app.core.database import async_session
+from app.models.course import Answer, Certificate, Comment, CourseTeacher, Enrollment
+from app.models.notification import Notification
+
+HOT_QUERIES = {
+    "enrollment by user and course": select(Enrollment).filter(
+        Enrollment.user_id == 1, Enrollment.course_id == 1
+    ),
+    "certificate by user and course": select(Certificate).filter(
+        Certificate.user_id == 1, Certificate.course_id == 1
+    ),
+    "teacher of course": select(CourseTeacher).filter(
+        CourseTeacher.course_id == 1, CourseTeacher.teacher_id == 1
+    ),
+    "answers by task and student": select(Answer).filter(
+        Answer.task_id == 1, Answer.student_id == 1
+    ),
+    "answers by student and course": select(Answer.score).filter(
+        Answer.student_id == 1, Answer.course_id == 1
+    ),
+    "answers by created_at": select(Answer.id).filter(
+        Answer.created_at >= datetime.now() - timedelta(days=30)
+    ),
+    "comments page by material": select(Comment)
+    .filter(Comment.material_id == 1, Comment.id > 0)
+    .order_by(Comment.id)
+    .limit(100),
+    "unread notifications page": select(Notification)
+    .filter(Notification.user_id == 1, Notification.is_read == False)
+    .order_by(Notification.id.desc())
+    .limit(100),
+}
+
+
+def _seq_scans(plan: dict) -> list:
+    found = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+async def main() -> int:
+    failures = 0
+    async with async_session() as db:
+        await db.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, query in HOT_QUERIES.items():
+            sql = str(query.compile(db.bind, compile_kwargs={"literal_binds": True}))
+            result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            seq_scans = _seq_scans(plan[0]["Plan"])
+            if seq_scans:
+                failures += 1
+                print(f"FAIL {name}: sequential scan on {', '.join(seq_scans)}")
+            else:
+                print(f"ok   {name}")
+        await db.rollback()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,31 @@
+# python -m app.commands.gc_file_blobs [--min-age-hours N]
+# Recounts blob references from lesson materials, answers and profile images,
+# then deletes blobs nothing points at.
+import argparse
+import asyncio
+from datetime import timedelta
+
+from app.core.database import async_session
+from app.crud.file import file_blob as crud_file_blob
+from app.services.file import file_service
+
+
+async def main(min_age_hours: int) -> None:
+    async with async_session() as db:
+        recounted = await crud_file_blob.recount(db)
+        paths = await crud_file_blob.remove_unreferenced(
+            db, older_than=timedelta(hours=min_age_hours)
+        )
+        # Rows first: a failed commit must not leave rows pointing at deleted files
+        await db.commit()
+        removed = await file_service.remove_stored_files(db, paths)
+    print(f"Recounted {recounted} blob(s), removed {len(paths)} unreferenced, {removed} file(s) deleted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recount and collect unreferenced upload blobs")
+    parser.add_argument(
+        "--min-age-hours", type=int, default=24, help="keep younger blobs, they may not be attached yet"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.min_age_hours))
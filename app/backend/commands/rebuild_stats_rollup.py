@@ -0,0 +1,19 @@
+# python -m app.commands.rebuild_stats_rollup [--course-id ID]
+import argparse
+import asyncio
+
+from app.core.database import async_session
+from app.crud.statistics import stats_rollup
+
+
+async def main(course_id=None) -> None:
+    async with async_session() as db:
+        rebuilt = await stats_rollup.rebuild(db, course_id=course_id)
+    print(f"Rebuilt statistics rollup for {rebuilt} course(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill course statistics rollups")
+    parser.add_argument("--course-id", type=int, default=None, help="rebuild a single course")
+    args = parser.parse_args()
+    asyncio.run(main(args.course_id))
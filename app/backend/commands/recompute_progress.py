@@ -0,0 +1,44 @@
+# python -m app.commands.recompute_progress [--course-id ID] [--chunk-size N]
+import argparse
+import asyncio
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.core.database import async_session
+from app.crud.course import recompute_course_progress
+from app.models.course import Course, Enrollment
+
+
+async def main(course_id=None, chunk_size=None) -> None:
+    async with async_session() as db:
+        stmt = select(Course.id).order_by(Course.id)
+        if course_id is not None:
+            stmt = stmt.filter(Course.id == course_id)
+        course_ids = (await db.execute(stmt)).scalars().all()
+
+        changed = 0
+        for number, current_id in enumerate(course_ids, start=1):
+            enrollments = (
+                await db.execute(
+                    select(func.count(Enrollment.id)).filter(Enrollment.course_id == current_id)
+                )
+            ).scalar()
+            prefix = f"[{number}/{len(course_ids)}] course {current_id}"
+
+            def report(processed: int) -> None:
+                print(f"{prefix}: {processed}/{enrollments} enrollments")
+
+            changed += await recompute_course_progress(
+                db, current_id, chunk_size=chunk_size, on_chunk=report
+            )
+            print(f"{prefix}: done")
+    print(f"Updated progress of {changed} enrollment(s) in {len(course_ids)} course(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute enrollment progress from answers")
+    parser.add_argument("--course-id", type=int, default=None, help="recompute a single course")
+    parser.add_argument("--chunk-size", type=int, default=None, help="enrollments per transaction")
+    args = parser.parse_args()
+    asyncio.run(main(args.course_id, args.chunk_size))
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is optional, caches stay process-local without it
+    redis = None
+
+
+class LRUCache:
+    def __init__(self, name: str, max_size: int, ttl: Optional[float] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        caches[name] = self
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        try:
+            value, expires_at = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TTLCache:
+    """Expiring results with single-flight recomputation and stale-while-revalidate.
+
+    Concurrent misses for the same key share one computation. Once an entry
+    expires it is still served for stale_ttl seconds while a background task
+    recomputes it.
+    """
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.recomputes = 0
+        self.recompute_time_total = 0.0
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        caches[name] = self
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float = 0.0,
+    ) -> Any:
+        now = time.monotonic()
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at, stale_until = entry
+            if now < expires_at:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+            if now < stale_until:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start(key, compute, ttl, stale_ttl)
+                return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+        self.misses += 1
+        return await asyncio.shield(self._start(key, compute, ttl, stale_ttl))
+
+    def _start(self, key, compute, ttl: float, stale_ttl: float) -> asyncio.Future:
+        # The computation runs as its own task so a cancelled request does not abort it
+        task = asyncio.ensure_future(self._compute(key, compute, ttl, stale_ttl))
+        self._inflight[key] = task
+        task.add_done_callback(self._retrieve_exception)
+        return task
+
+    async def _compute(self, key, compute, ttl: float, stale_ttl: float) -> Any:
+        start = time.monotonic()
+        try:
+            value = await compute()
+        finally:
+            self._inflight.pop(key, None)
+        finished = time.monotonic()
+        self.recomputes += 1
+        self.recompute_time_total += finished - start
+        self._data[key] = (value, finished + ttl, finished + ttl + stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _retrieve_exception(task: asyncio.Future) -> None:
+        # Background refreshes nobody awaits must not log "exception never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.stale_hits + self.coalesced) / lookups if lookups else 0.0,
+            "recomputes": self.recomputes,
+            "avg_recompute_time": (
+                self.recompute_time_total / self.recomputes if self.recomputes else 0.0
+            ),
+        }
+
+
+class SharedCache:
+    """JSON values in Redis, shared by all workers; a no-op when Redis is not configured."""
+
+    def __init__(self, prefix: str, ttl: int):
+        self.prefix = prefix
+        self.ttl = ttl
+        self._client = None
+        if redis is not None and settings.CACHE_REDIS_URL:
+            self._client = redis.from_url(settings.CACHE_REDIS_URL)
+
+    @property
+    def enabled(self) -> bool:
+        return self._client is not None
+
+    async def get(self, key: str) -> Optional[Any]:
+        if self._client is None:
+            return None
+        try:
+            raw = await self._client.get(f"{self.prefix}:{key}")
+        except redis.RedisError:
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any) -> None:
+        if self._client is None:
+            return
+        try:
+            await self._client.set(f"{self.prefix}:{key}", json.dumps(value), ex=self.ttl)
+        except redis.RedisError:
+            pass
+
+
+class InvalidationChannel:
+    """Deletes keys from a per-worker cache in every worker, over Redis pub/sub when configured."""
+
+    def __init__(self, name: str, cache: LRUCache):
+        self.channel = f"invalidate:{name}"
+        self.cache = cache
+        self._client = None
+        if redis is not None and settings.CACHE_REDIS_URL:
+            self._client = redis.from_url(settings.CACHE_REDIS_URL)
+        channels.append(self)
+
+    async def publish(self, key: Hashable) -> None:
+        self.cache.delete(key)
+        if self._client is None:
+            return
+        try:
+            await self._client.publish(self.channel, json.dumps(key))
+        except redis.RedisError:
+            pass
+
+    async def listen(self) -> None:
+        if self._client is None:
+            return
+        while True:
+            try:
+                pubsub = self._client.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.cache.delete(json.loads(message["data"]))
+            except redis.RedisError:
+                # Invalidations may have been missed while disconnected
+                self.cache.clear()
+                await asyncio.sleep(1)
+
+
+# Registry of in-process caches, reported by the admin cache stats endpoint
+caches: Dict[str, Any] = {}
+channels: List[InvalidationChannel] = []
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def start_invalidation_listeners() -> List[asyncio.Task]:
+    return [asyncio.ensure_future(channel.listen()) for channel in channels]
@@ -9,14 +9,89 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
+
+    # Database pool settings
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 30 * 60  # seconds
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection, 0 disables
+    DB_ECHO: bool = False
+    DB_PARALLEL_QUERIES: int = 4  # connections one request may use for concurrent read-only queries
+
+    # Read replicas, comma separated hosts; empty means reads go to the primary
+    POSTGRES_REPLICA_SERVERS: str = ""
+    # Seconds a user stays pinned to the primary after a write, shared via CACHE_REDIS_URL when set
+    REPLICA_PIN_AFTER_WRITE: float = 5.0
+
+    # Per-request query profiling
+    QUERY_LOG_SAMPLE_RATE: float = 0.01  # share of requests logged with their query summary
+    QUERY_N_PLUS_ONE_THRESHOLD: int = 5  # identical statements per request before flagging N+1
+
+    # Caching, CACHE_REDIS_URL enables the shared backend (e.g. redis://redis:6379/0)
+    CACHE_REDIS_URL: str = ""
+    OUTLINE_CACHE_SIZE: int = 256  # course outlines kept per worker
+    OUTLINE_CACHE_TTL: int = 24 * 60 * 60  # seconds an outline is kept, per worker and shared
+    PRINCIPAL_CACHE_SIZE: int = 10000  # authenticated users kept per worker
+    PRINCIPAL_CACHE_TTL: int = 30  # seconds, bounds staleness if an invalidation is lost
+
+    # Statistics result cache, seconds fresh / extra seconds served stale while recomputing
+    STATS_CACHE_SIZE: int = 1024
+    STATS_COURSE_TTL: int = 60
+    STATS_PROGRESS_TTL: int = 60
+    STATS_ACTIVITY_TTL: int = 30
+    STATS_SYSTEM_TTL: int = 300
+    STATS_STALE_TTL: int = 300
+
+    # Enrollments updated per transaction when a course's progress is recomputed
+    PROGRESS_RECOMPUTE_CHUNK_SIZE: int = 5000
+
+    # Cache-Control max-age for public course endpoints
+    COURSES_HTTP_MAX_AGE: int = 60
     
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
 
+    # Stateless mode: access tokens carry role/active claims and are checked without the DB
+    AUTH_STATELESS: bool = False
+    STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_SYNC_INTERVAL: float = 5.0  # seconds between reloads of revoked tokens
+    REVOCATION_SYNC_OVERLAP: float = 60.0  # seconds each reload looks back for late commits
+
+    # Password hashing runs in a thread pool off the event loop
+    BCRYPT_ROUNDS: int = 12  # stored hashes with other costs are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 2  # threads, and so hashes computed at once
+    PASSWORD_HASH_MAX_WAITING: int = 64  # queued hashes before new ones are rejected with 503
+
     # File upload settings
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes read and written per step while streaming uploads
+
+    # Resumable uploads
+    TEACHER_MAX_FILE_SIZE: int = 4 * 1024 * 1024 * 1024  # 4GB, teachers and admins (lesson videos)
+    RESUMABLE_CHUNK_MAX_SIZE: int = 64 * 1024 * 1024  # largest body of a single PUT
+    RESUMABLE_UPLOAD_TTL: int = 24 * 60 * 60  # seconds an idle session is kept
+    RESUMABLE_UPLOAD_CLEANUP_INTERVAL: int = 10 * 60  # seconds between sweeps of expired sessions
+
+    # File storage: "local" keeps files under UPLOAD_DIR, "s3" uses an S3-compatible bucket
+    # (AWS, MinIO, ...) and needs boto3 installed
+    STORAGE_BACKEND: str = "local"
+    S3_ENDPOINT_URL: str = ""  # e.g. http://minio:9000, empty for AWS
+    S3_BUCKET: str = ""
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_PRESIGN_EXPIRES: int = 15 * 60  # seconds presigned URLs stay valid
+
+    # Downloads: "" serves bytes from the app, "x-accel-redirect" (nginx) or "x-sendfile"
+    # (Apache, lighttpd) only authorize and leave the transfer to the front proxy
+    FILE_ACCEL_MODE: str = ""
+    UPLOAD_ACCEL_PREFIX: str = "/protected/uploads/"  # internal location mapped to UPLOAD_DIR
+    CERTIFICATES_ACCEL_PREFIX: str = "/protected/certificates/"
     ALLOWED_FILE_EXTENSIONS: str = ".jpg,.jpeg,.png,.gif,.pdf,.doc,.docx,.txt,.mp4,.mov,.avi,.mp3,.wav"
     
     # Backup settings
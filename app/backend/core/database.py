@@ -1,20 +1,269 @@
+import asyncio
+import bisect
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from app.core.cache import redis
 from app.core.config import settings
 
-SQLALCHEMY_DATABASE_URL = (
-    f"postgresql+asyncpg://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
-    f"@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
-)
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, future=True, echo=True)
+def _database_url(server: str) -> str:
+    return (
+        f"postgresql+asyncpg://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
+        f"@{server}/{settings.POSTGRES_DB}"
+    )
+
+
+SQLALCHEMY_DATABASE_URL = _database_url(settings.POSTGRES_SERVER)
+
+# Upper bounds of the acquire latency histogram buckets, in milliseconds
+ACQUIRE_LATENCY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolStats:
+    def __init__(self):
+        self.waiters = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.acquire_time_total = 0.0
+        self.acquire_buckets = [0] * (len(ACQUIRE_LATENCY_BUCKETS) + 1)
+
+    def observe_acquire(self, elapsed: float) -> None:
+        self.acquired += 1
+        self.acquire_time_total += elapsed
+        self.acquire_buckets[bisect.bisect_left(ACQUIRE_LATENCY_BUCKETS, elapsed * 1000)] += 1
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records waiters and connection acquire latency."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Per pool, the primary and every replica engine report their own figures
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # Invalidation swaps in a fresh pool, the counters carry over
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        stats = self.stats
+        stats.waiters += 1
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.waiters -= 1
+        stats.observe_acquire(time.perf_counter() - start)
+        return connection
+
+
+def _create_engine(url: str):
+    return create_async_engine(
+        url,
+        future=True,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
 async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+replica_engines = [
+    _create_engine(_database_url(server.strip()))
+    for server in settings.POSTGRES_REPLICA_SERVERS.split(",")
+    if server.strip()
+]
+replica_sessions = [
+    sessionmaker(replica, expire_on_commit=False, class_=AsyncSession)
+    for replica in replica_engines
+]
+_replica_cycle = itertools.cycle(replica_sessions) if replica_sessions else None
+
 Base = declarative_base()
 
 
-async def get_db() -> AsyncSession:
+def _engine_pool_stats(engine) -> Dict[str, Any]:
+    pool = engine.sync_engine.pool
+    stats = pool.stats
+    buckets = {}
+    cumulative = 0
+    for bound, count in zip(ACQUIRE_LATENCY_BUCKETS + ("+Inf",), stats.acquire_buckets):
+        cumulative += count
+        buckets[str(bound)] = cumulative
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "waiters": stats.waiters,
+        "timeouts": stats.timeouts,
+        "acquire_count": stats.acquired,
+        "acquire_time_total": stats.acquire_time_total,
+        "acquire_latency_ms_buckets": buckets,
+    }
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    return {
+        "primary": _engine_pool_stats(engine),
+        "replicas": [
+            {"host": replica.url.host, **_engine_pool_stats(replica)}
+            for replica in replica_engines
+        ],
+    }
+
+
+def read_session() -> AsyncSession:
+    # Session on a replica when configured, for background work without a client to pin
+    session_factory = next(_replica_cycle) if _replica_cycle is not None else async_session
+    return session_factory()
+
+
+async def gather_in_snapshot(
+    db: AsyncSession,
+    *calls: Callable[[AsyncSession], Awaitable[Any]],
+    limit: Optional[int] = None,
+) -> List[Any]:
+    """Run read-only calls concurrently, each on its own pooled connection.
+
+    All of them see the snapshot exported from db's transaction, so the
+    results are as consistent as if they ran one after another on db.
+    """
+    snapshot = (await db.execute(text("SELECT pg_export_snapshot()"))).scalar()
+    semaphore = asyncio.Semaphore(limit or settings.DB_PARALLEL_QUERIES)
+
+    async def run(call):
+        async with semaphore:
+            async with AsyncSession(db.bind, expire_on_commit=False) as session:
+                await session.connection(
+                    execution_options={"isolation_level": "REPEATABLE READ"}
+                )
+                # Snapshot ids come from the server, SET does not accept bind parameters
+                await session.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+                try:
+                    return await call(session)
+                finally:
+                    await session.rollback()
+
+    # db keeps its transaction open until every call has imported the snapshot
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+class PrimaryPins:
+    """Clients that committed on the primary within REPLICA_PIN_AFTER_WRITE seconds.
+
+    Shared by all workers through Redis when CACHE_REDIS_URL is set, otherwise
+    kept per process.
+    """
+
+    def __init__(self):
+        self._local: Dict[str, float] = {}
+        self._client = None
+        self._pending = set()
+        if redis is not None and settings.CACHE_REDIS_URL:
+            self._client = redis.from_url(settings.CACHE_REDIS_URL)
+
+    def pin(self, client: str) -> None:
+        now = time.monotonic()
+        if len(self._local) > 10000:
+            for key, written_at in list(self._local.items()):
+                if now - written_at > settings.REPLICA_PIN_AFTER_WRITE:
+                    del self._local[key]
+        self._local[client] = now
+        if self._client is not None:
+            # Called from a sync session event, the write finishes before the response is sent
+            task = asyncio.ensure_future(self._publish(client))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _publish(self, client: str) -> None:
+        try:
+            await self._client.set(
+                f"primary-pin:{client}",
+                1,
+                px=int(settings.REPLICA_PIN_AFTER_WRITE * 1000),
+            )
+        except redis.RedisError:
+            pass
+
+    async def is_pinned(self, client: str) -> bool:
+        written_at = self._local.get(client)
+        if written_at is not None:
+            if time.monotonic() - written_at <= settings.REPLICA_PIN_AFTER_WRITE:
+                return True
+            del self._local[client]
+        if self._client is None:
+            return False
+        try:
+            return bool(await self._client.exists(f"primary-pin:{client}"))
+        except redis.RedisError:
+            # Without the shared state the primary is always consistent
+            return True
+
+
+primary_pins = PrimaryPins()
+# Client currently served by get_db, used to pin it to the primary after a commit
+_current_client: ContextVar[Optional[str]] = ContextVar("current_client", default=None)
+
+
+def _client_key(request: Request) -> str:
+    # Pins follow the user across token refreshes; only routing depends on it,
+    # so the token is verified later by get_current_user, not here
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = jwt.get_unverified_claims(token).get("sub")
+        except JWTError:
+            subject = None
+        if subject is not None:
+            return f"user:{subject}"
+    return f"host:{request.client.host}" if request.client else ""
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_write(session: Session) -> None:
+    client = _current_client.get()
+    if client is None or session.bind is not engine.sync_engine:
+        return
+    primary_pins.pin(client)
+
+
+async def get_db(request: Request) -> AsyncSession:
+    _current_client.set(_client_key(request))
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    client = _client_key(request)
+    if _replica_cycle is None or await primary_pins.is_pinned(client):
+        session_factory = async_session
+    else:
+        session_factory = next(_replica_cycle)
+    _current_client.set(client)
+    async with session_factory() as session:
+        yield session
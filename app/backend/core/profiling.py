@@ -0,0 +1,85 @@
+import logging
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.db.queries")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[statement] += 1
+
+    def repeated_shapes(self, threshold: int) -> list:
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+# The start time lives on the execution context, which is discarded with a
+# failed statement instead of outliving it on the pooled connection
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None and context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    start = getattr(context, "_query_start", None)
+    if stats is None or start is None:
+        return
+    stats.record(statement, time.perf_counter() - start)
+
+
+async def query_stats_middleware(request: Request, call_next):
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _query_stats.reset(token)
+
+    db_time_ms = stats.total_time * 1000
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = f"{db_time_ms:.2f}"
+
+    repeated = stats.repeated_shapes(settings.QUERY_N_PLUS_ONE_THRESHOLD)
+    if repeated:
+        response.headers["X-DB-N-Plus-One"] = str(len(repeated))
+        for shape, n in repeated:
+            logger.warning(
+                "Probable N+1: %s %s ran %d times: %s",
+                request.method, request.url.path, n, " ".join(shape.split()),
+            )
+
+    if stats.count and random.random() < settings.QUERY_LOG_SAMPLE_RATE:
+        logger.info(
+            "db_queries",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status_code": response.status_code,
+                "query_count": stats.count,
+                "db_time_ms": round(db_time_ms, 2),
+                "distinct_statements": len(stats.shapes),
+            },
+        )
+    return response
@@ -1,26 +1,294 @@
 # app/core/security.py
-from datetime import datetime, timedelta
-from typing import Optional
+import asyncio
+import bisect
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
 
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import InvalidationChannel, LRUCache
 from app.core.config import settings
+from app.core.database import async_session
+from app.models.user import TokenRevocation, User, UserRole
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# Hashes outside [min_rounds, max_rounds] are reported by verify_and_update for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+# Verified instead of a stored hash for unknown e-mails, so they take as long as a wrong password
+_DUMMY_HASH = pwd_context.hash(uuid.uuid4().hex)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+# Upper bounds of the hashing queue time histogram buckets, in milliseconds
+HASH_QUEUE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+
+class HashPoolStats:
+    def __init__(self):
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_time_total = 0.0
+        self.hash_time_total = 0.0
+        self.queue_buckets = [0] * (len(HASH_QUEUE_BUCKETS) + 1)
+
+    def observe(self, queued: float, hashing: float) -> None:
+        self.completed += 1
+        self.queue_time_total += queued
+        self.hash_time_total += hashing
+        self.queue_buckets[bisect.bisect_left(HASH_QUEUE_BUCKETS, queued * 1000)] += 1
+
+
+# bcrypt releases the GIL, so a few threads hash in parallel without blocking the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+hash_stats = HashPoolStats()
+
+
+async def _run_hashing(func: Callable, *args) -> Any:
+    if hash_stats.in_flight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_WAITING:
+        hash_stats.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    def timed():
+        started = time.perf_counter()
+        return started, func(*args), time.perf_counter()
+
+    submitted = time.perf_counter()
+    hash_stats.in_flight += 1
+    try:
+        started, result, finished = await asyncio.get_running_loop().run_in_executor(
+            _hash_executor, timed
+        )
+    finally:
+        hash_stats.in_flight -= 1
+    hash_stats.observe(started - submitted, finished - started)
+    return result
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(pwd_context.verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    # The new hash is set when the stored one uses outdated cost parameters;
+    # without a stored hash a dummy one is checked and the result is always False
+    if hashed_password is None:
+        await _run_hashing(pwd_context.verify, plain_password, _DUMMY_HASH)
+        return False, None
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
+
+
+def get_password_hash_stats() -> Dict[str, Any]:
+    buckets = {}
+    cumulative = 0
+    for bound, count in zip(HASH_QUEUE_BUCKETS + ("+Inf",), hash_stats.queue_buckets):
+        cumulative += count
+        buckets[str(bound)] = cumulative
+    completed = hash_stats.completed or 1
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "in_flight": hash_stats.in_flight,
+        "completed": hash_stats.completed,
+        "rejected": hash_stats.rejected,
+        "queue_time_avg_ms": hash_stats.queue_time_total / completed * 1000,
+        "hash_time_avg_ms": hash_stats.hash_time_total / completed * 1000,
+        "queue_time_ms_buckets": buckets,
+    }
+
+# Column values of authenticated users, so get_current_user skips the users lookup
+principal_cache = LRUCache(
+    "principals", max_size=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL
+)
+principal_invalidation = InvalidationChannel("principals", principal_cache)
+
+
+def cache_principal(user: User) -> None:
+    principal_cache.set(
+        user.id, {column.key: getattr(user, column.key) for column in User.__table__.columns}
+    )
+
+
+def get_cached_principal(user_id: int) -> Optional[User]:
+    columns = principal_cache.get(user_id)
+    if columns is None:
+        return None
+    # A fresh detached instance per request, so changes to it never leak into the cache
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return user
+
+
+async def invalidate_principal(user_id: int) -> None:
+    await principal_invalidation.publish(user_id)
+
+
+def create_access_token(
+    subject: str,
+    expires_delta: Optional[timedelta] = None,
+    *,
+    user: Optional[User] = None,
+) -> str:
+    # With a user the token also carries role/active claims for stateless authorization
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
+    elif user is not None and settings.AUTH_STATELESS:
+        expire = datetime.utcnow() + timedelta(minutes=settings.STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES)
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "iat": time.time(), "jti": uuid.uuid4().hex}
+    if user is not None:
+        to_encode["role"] = getattr(user.role, "value", user.role)
+        to_encode["active"] = bool(user.is_active)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+
+def create_refresh_token(subject: str) -> str:
+    to_encode = {
+        "exp": datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        "sub": str(subject),
+        "iat": time.time(),
+        "jti": uuid.uuid4().hex,
+        "type": "refresh",
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def principal_from_claims(payload: Dict[str, Any]) -> User:
+    # Only id, role and is_active are loaded, other attributes need a DB lookup
+    user = User(
+        id=int(payload["sub"]), role=UserRole(payload["role"]), is_active=payload["active"]
+    )
+    make_transient_to_detached(user)
+    return user
+
+
+class RevocationList:
+    """In-memory mirror of token_revocations, consulted on every authenticated request."""
+
+    def __init__(self):
+        # Latest created_at seen; rows are ordered by it rather than by id,
+        # since ids are handed out before commit and can become visible out of order
+        self.last_created_at: Optional[datetime] = None
+        self.synced_at: Optional[datetime] = None
+        self._jtis: Dict[str, float] = {}  # jti -> expiry timestamp
+        self._users: Dict[int, float] = {}  # user id -> tokens issued before are revoked
+
+    def add(self, row: TokenRevocation) -> None:
+        # Idempotent, overlapping syncs may see a row more than once
+        expires_at = row.expires_at.timestamp()
+        if row.jti:
+            self._jtis[row.jti] = expires_at
+        if row.user_id is not None and row.revoked_before is not None:
+            self._users[row.user_id] = max(
+                self._users.get(row.user_id, 0.0), row.revoked_before.timestamp()
+            )
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        if payload.get("jti") in self._jtis:
+            return True
+        cutoff = self._users.get(int(payload["sub"]))
+        return cutoff is not None and payload.get("iat", 0) < cutoff
+
+    async def sync(self, db: AsyncSession) -> None:
+        now = datetime.now(timezone.utc)
+        stmt = select(TokenRevocation).filter(TokenRevocation.expires_at > now)
+        if self.last_created_at is not None:
+            # Rows committed up to REVOCATION_SYNC_OVERLAP after their created_at are still picked up
+            stmt = stmt.filter(
+                TokenRevocation.created_at
+                > self.last_created_at - timedelta(seconds=settings.REVOCATION_SYNC_OVERLAP)
+            )
+        result = await db.execute(stmt.order_by(TokenRevocation.created_at))
+        for row in result.scalars():
+            self.add(row)
+            self.last_created_at = row.created_at
+        timestamp = now.timestamp()
+        self._jtis = {jti: exp for jti, exp in self._jtis.items() if exp > timestamp}
+        # A per-user cutoff outlives every token it could apply to after the refresh lifetime
+        horizon = timestamp - settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+        self._users = {user_id: cutoff for user_id, cutoff in self._users.items() if cutoff > horizon}
+        self.synced_at = now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "revoked_tokens": len(self._jtis),
+            "revoked_users": len(self._users),
+            "last_created_at": self.last_created_at,
+            "synced_at": self.synced_at,
+        }
+
+
+revocations = RevocationList()
+
+
+async def revoke_tokens(
+    db: AsyncSession,
+    *,
+    jti: Optional[str] = None,
+    user_id: Optional[int] = None,
+    expires_at: Optional[datetime] = None,
+) -> bool:
+    """Revoke one token by id, or with only user_id every token the user holds now.
+
+    Returns False when the token id was already revoked, so a single-use token
+    is consumed by exactly one caller.
+    """
+    now = datetime.now(timezone.utc)
+    values = {
+        "jti": jti,
+        "user_id": user_id,
+        "revoked_before": now if jti is None else None,
+        "expires_at": expires_at or now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        # Commit time rather than transaction start, keeps the sync overlap small
+        "created_at": func.clock_timestamp(),
+    }
+    stmt = pg_insert(TokenRevocation).values(**values).returning(TokenRevocation)
+    if jti is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["jti"])
+    row = (await db.execute(stmt)).scalars().first()
+    await db.commit()
+    if row is None:
+        return False
+    # Effective here at once, other workers pick it up on their next sync
+    revocations.add(row)
+    return True
+
+
+async def sync_revocations_forever() -> None:
+    while True:
+        try:
+            async with async_session() as db:
+                await revocations.sync(db)
+        except Exception:
+            logger.exception("Token revocation sync failed")
+        await asyncio.sleep(settings.REVOCATION_SYNC_INTERVAL)
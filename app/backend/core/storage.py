@@ -0,0 +1,183 @@
+import base64
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 is optional, only the S3 backend needs it
+    boto3 = None
+
+
+class StorageBackend(ABC):
+    """Stored files addressed by key, a relative path such as blobs/ab/cd/<sha256>.pdf."""
+
+    @abstractmethod
+    async def save(self, key: str, source: Path) -> None:
+        """Take over a finished local file, source no longer exists afterwards."""
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Size in bytes, None when nothing is stored under the key."""
+
+    async def exists(self, key: str) -> bool:
+        return await self.size(key) is not None
+
+    async def checksum_sha256(self, key: str) -> Optional[str]:
+        """Hex SHA-256 the backend recorded for the stored content, None when unknown."""
+        return None
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Whether something was stored under the key."""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        # Only backends on the local filesystem can hand out a path
+        return None
+
+    def presigned_get_url(
+        self, key: str, filename: Optional[str] = None, media_type: Optional[str] = None
+    ) -> Optional[str]:
+        return None
+
+    def presigned_put_url(
+        self, key: str, size: int, sha256: str
+    ) -> Optional[Tuple[str, Dict[str, str]]]:
+        # (url, headers the client must send), None when clients cannot upload directly
+        return None
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Optional[Path]:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            return None
+        return path
+
+    async def save(self, key: str, source: Path) -> None:
+        path = self._path(key)
+        if path is None:
+            raise ValueError(f"Invalid storage key {key!r}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Staging files live under the same root, so this is a rename
+        await run_in_threadpool(os.replace, source, path)
+
+    async def size(self, key: str) -> Optional[int]:
+        path = self.local_path(key)
+        return path.stat().st_size if path else None
+
+    async def delete(self, key: str) -> bool:
+        path = self._path(key)
+        try:
+            if path is not None and path.is_file():
+                path.unlink()
+                return True
+            return False
+        except OSError:
+            return False
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        if path is not None and path.is_file():
+            return path
+        return None
+
+
+class S3Storage(StorageBackend):
+    def __init__(self):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3")
+        self.bucket = settings.S3_BUCKET
+        # boto3 clients are thread safe, blocking calls run in the thread pool
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            aws_access_key_id=settings.S3_ACCESS_KEY or None,
+            aws_secret_access_key=settings.S3_SECRET_KEY or None,
+            region_name=settings.S3_REGION,
+            config=BotoConfig(
+                signature_version="s3v4",
+                s3={"addressing_style": "path" if settings.S3_ENDPOINT_URL else "auto"},
+            ),
+        )
+
+    async def save(self, key: str, source: Path) -> None:
+        # upload_file switches to parallel multipart uploads for large files
+        await run_in_threadpool(self.client.upload_file, str(source), self.bucket, key)
+        await run_in_threadpool(source.unlink)
+
+    async def _head(self, key: str, **params) -> Optional[Dict]:
+        try:
+            return await run_in_threadpool(
+                self.client.head_object, Bucket=self.bucket, Key=key, **params
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    async def size(self, key: str) -> Optional[int]:
+        head = await self._head(key)
+        return None if head is None else head["ContentLength"]
+
+    async def checksum_sha256(self, key: str) -> Optional[str]:
+        # Multipart uploads carry a checksum of part checksums ("<base64>-<parts>"),
+        # which says nothing about the content hash
+        head = await self._head(key, ChecksumMode="ENABLED")
+        checksum = head and head.get("ChecksumSHA256")
+        if not checksum or "-" in checksum:
+            return None
+        return base64.b64decode(checksum).hex()
+
+    async def delete(self, key: str) -> bool:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=key)
+        return True
+
+    def presigned_get_url(
+        self, key: str, filename: Optional[str] = None, media_type: Optional[str] = None
+    ) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+        if media_type:
+            params["ResponseContentType"] = media_type
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=settings.S3_PRESIGN_EXPIRES
+        )
+
+    def presigned_put_url(
+        self, key: str, size: int, sha256: str
+    ) -> Optional[Tuple[str, Dict[str, str]]]:
+        # The signature covers length and checksum, so the bucket rejects any other content
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentLength": size,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=settings.S3_PRESIGN_EXPIRES,
+        )
+        return url, {"Content-Length": str(size), "x-amz-checksum-sha256": checksum}
+
+
+def _create_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage()
+    return LocalStorage(settings.UPLOAD_DIR)
+
+
+storage = _create_storage()
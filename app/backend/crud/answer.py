@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from app.crud.base import CRUDBase
+from app.crud.course import course_ids_of
+from app.crud.enrollment import enrollment as crud_enrollment
+from app.crud.file import file_blob
+from app.crud.statistics import stats_rollup
+from app.models.course import Answer, Task
+from app.schemas.task import AnswerCreate, AnswerUpdate
+
+
+class CRUDAnswer(CRUDBase[Answer, AnswerCreate, AnswerUpdate]):
+    tracked_fields = ("score", "course_id", "student_id", "file_path")
+
+    async def get_with_details(self, db: AsyncSession, id: int) -> Optional[Answer]:
+        result = await db.execute(
+            select(self.model)
+            .options(joinedload(self.model.task), joinedload(self.model.student))
+            .filter(self.model.id == id)
+        )
+        return result.scalars().first()
+
+    async def _before_create(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        course_ids = await course_ids_of(db, Task.id, [row.get("task_id") for row in rows])
+        for row in rows:
+            row["course_id"] = course_ids.get(row.get("task_id"))
+
+    async def _on_create(self, db: AsyncSession, objs: Sequence[Answer]) -> None:
+        await file_blob.update_references(db, acquired=[obj.file_path for obj in objs])
+        for obj in objs:
+            if obj.course_id is not None:
+                await stats_rollup.record_answer(
+                    db, course_id=obj.course_id, student_id=obj.student_id, score=obj.score
+                )
+                # Same transaction as the answer, so progress never misses or repeats a score
+                await crud_enrollment.apply_score_delta(
+                    db, user_id=obj.student_id, course_id=obj.course_id, delta=obj.score or 0.0
+                )
+
+    async def _on_update(
+        self, db: AsyncSession, changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        await file_blob.sync_references(db, changes)
+        for old, new in changes:
+            if old["course_id"] is not None and new.get("score", old["score"]) != old["score"]:
+                await stats_rollup.record_grade(
+                    db, course_id=old["course_id"], old_score=old["score"], new_score=new["score"]
+                )
+                # old is the locked row, so the delta holds under concurrent grading
+                await crud_enrollment.apply_score_delta(
+                    db,
+                    user_id=old["student_id"],
+                    course_id=old["course_id"],
+                    delta=(new["score"] or 0.0) - (old["score"] or 0.0),
+                )
+
+    async def _on_remove(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        await stats_rollup.record_answers_removed(db, Answer.id.in_(ids))
+        result = await db.execute(select(Answer.file_path).where(Answer.id.in_(ids)))
+        await file_blob.update_references(db, released=result.scalars().all())
+
+
+answer = CRUDAnswer(Answer)
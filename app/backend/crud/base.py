@@ -1,9 +1,13 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import column, delete, insert, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.sql import Select
 
 from app.models.base import Base
 
@@ -12,10 +16,56 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def encode_cursor(id: int) -> str:
+    return base64.urlsafe_b64encode(str(id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Rows sent per statement by the *_multi methods
+    batch_size: int = 1000
+    # Columns whose previous values _on_update receives when an update changes one of them
+    tracked_fields: Tuple[str, ...] = ()
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
+    def _batches(self, items: Sequence[Any], batch_size: Optional[int]):
+        size = batch_size or self.batch_size
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def _has_delete_cascades(self) -> bool:
+        return any(rel.cascade.delete for rel in self.model.__mapper__.relationships)
+
+    async def _on_write(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        # Hook for subclasses, runs inside the write transaction while the rows still exist
+        pass
+
+    async def _before_create(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        # Hook for subclasses to fill in derived columns of the encoded rows, in place
+        pass
+
+    # The hooks below also run inside the write transaction, before its commit
+    async def _on_create(self, db: AsyncSession, objs: Sequence[ModelType]) -> None:
+        pass
+
+    async def _on_update(
+        self, db: AsyncSession, changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        # (id and old tracked_fields, id and new values) per row
+        pass
+
+    async def _on_remove(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        # Before the DELETE, the rows are still there
+        pass
+
     async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
         result = await db.execute(select(self.model).filter(self.model.id == id))
         return result.scalars().first()
@@ -26,10 +76,37 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(select(self.model).offset(skip).limit(limit))
         return result.scalars().all()
 
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        stmt: Optional[Select] = None,
+        descending: bool = False,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        # Keyset pagination over id, returns the page and the cursor of the next one
+        if stmt is None:
+            stmt = select(self.model)
+        if cursor is not None:
+            last_id = decode_cursor(cursor)
+            stmt = stmt.filter(self.model.id < last_id if descending else self.model.id > last_id)
+        stmt = stmt.order_by(self.model.id.desc() if descending else self.model.id).limit(limit + 1)
+        result = await db.execute(stmt)
+        items = result.scalars().unique().all()
+        if len(items) > limit:
+            items = items[:limit]
+            return items, encode_cursor(items[-1].id)
+        return items, None
+
     async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
+        await self._before_create(db, [obj_in_data])
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
+        await db.flush()
+        await self._on_create(db, [db_obj])
+        await self._on_write(db, [db_obj.id])
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
@@ -41,24 +118,201 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        
-        db.add(db_obj)
+
+        columns = self.model.__table__.columns.keys()
+        update_data = {field: value for field, value in update_data.items() if field in columns}
+        # API update schemas carry the version the client edited; falling back to the
+        # loaded row only guards writes that never left the server
+        expected_version = update_data.pop("version", getattr(db_obj, "version", None))
+        if not update_data:
+            return db_obj
+        if any(field.endswith("_id") for field in update_data):
+            # The row may move to another parent, let the hook see the old one too
+            await self._on_write(db, [db_obj.id])
+
+        # Single UPDATE ... RETURNING, the identity map copy of db_obj is refreshed in place
+        stmt = (
+            update(self.model)
+            .where(self.model.id == db_obj.id)
+            .values(**update_data)
+            .returning(self.model)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        tracked = self.tracked_fields if set(self.tracked_fields) & update_data.keys() else ()
+        if tracked:
+            # Previous values come from a locked self-join, still in the one statement
+            old = (
+                select(self.model.id, *(getattr(self.model, field) for field in tracked))
+                .where(self.model.id == db_obj.id)
+                .with_for_update()
+                .subquery("old")
+            )
+            stmt = stmt.where(self.model.id == old.c.id).returning(
+                *(old.c[field] for field in tracked)
+            )
+        if "version" in columns:
+            stmt = stmt.where(self.model.version == expected_version).values(
+                version=self.model.version + 1
+            )
+        result = await db.execute(stmt)
+        row = result.first()
+        if row is None:
+            await db.rollback()
+            raise StaleDataError(
+                f"{self.model.__name__} {db_obj.id} was modified or deleted concurrently"
+            )
+        updated = row[0]
+        if tracked:
+            await self._on_update(
+                db,
+                [(
+                    {"id": db_obj.id, **dict(zip(tracked, row[1:]))},
+                    {"id": db_obj.id, **update_data},
+                )],
+            )
+        await self._on_write(db, [db_obj.id])
         await db.commit()
-        await db.refresh(db_obj)
-        return db_obj
+        return updated
 
     async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
-        obj = await db.execute(select(self.model).filter(self.model.id == id))
-        obj = obj.scalars().first()
-        await db.delete(obj)
+        await self._on_write(db, [id])
+        await self._on_remove(db, [id])
+        # ORM cascades (e.g. course -> modules) need the object loaded into the session
+        if self._has_delete_cascades():
+            obj = await db.execute(select(self.model).filter(self.model.id == id))
+            obj = obj.scalars().first()
+            await db.delete(obj)
+            await db.commit()
+            return obj
+
+        result = await db.execute(
+            delete(self.model)
+            .where(self.model.id == id)
+            .returning(self.model)
+            .execution_options(synchronize_session=False)
+        )
+        obj = result.scalars().first()
+        await db.commit()
+        return obj
+
+    async def create_multi(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        batch_size: Optional[int] = None,
+    ) -> List[ModelType]:
+        rows = [jsonable_encoder(obj_in) for obj_in in objs_in]
+        await self._before_create(db, rows)
+        created = []
+        for batch in self._batches(rows, batch_size):
+            result = await db.scalars(insert(self.model).returning(self.model), batch)
+            created.extend(result.all())
+        await self._on_create(db, created)
+        await self._on_write(db, [obj.id for obj in created])
+        await db.commit()
+        return created
+
+    async def update_multi(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> int:
+        # Each dict must contain "id" plus the columns to change
+        tracked = self.tracked_fields
+        if tracked and any(set(tracked) & row.keys() for row in objs_in):
+            result = await db.execute(
+                select(self.model.id, *(getattr(self.model, field) for field in tracked))
+                .where(self.model.id.in_([row["id"] for row in objs_in]))
+                .with_for_update()
+            )
+            old = {row[0]: {"id": row[0], **dict(zip(tracked, row[1:]))} for row in result.all()}
+        else:
+            old = None
+        if "version" in self.model.__table__.columns:
+            await self._update_versioned(db, objs_in, batch_size)
+        else:
+            for batch in self._batches(list(objs_in), batch_size):
+                await db.execute(update(self.model), batch)
+        if old is not None:
+            await self._on_update(
+                db, [(old[row["id"]], row) for row in objs_in if row["id"] in old]
+            )
+        await self._on_write(db, [row["id"] for row in objs_in])
+        await db.commit()
+        return len(objs_in)
+
+    async def _update_versioned(
+        self,
+        db: AsyncSession,
+        objs_in: Sequence[Dict[str, Any]],
+        batch_size: Optional[int],
+    ) -> None:
+        # One UPDATE ... FROM (VALUES ...) per batch and column set: bumps version like
+        # update() and checks it for rows that carry one; asyncpg reports no per-row
+        # counts for executemany, so the matched rows come back through RETURNING
+        table = self.model.__table__
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in objs_in:
+            row = {field: value for field, value in row.items() if field in table.columns}
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for fields, rows in groups.items():
+            columns = [column(field, table.c[field].type) for field in fields]
+            changed = [field for field in fields if field not in ("id", "version")]
+            for batch in self._batches(rows, batch_size):
+                data = values(*columns, name="data").data(
+                    [tuple(row[field] for field in fields) for row in batch]
+                )
+                stmt = (
+                    update(table)
+                    .where(table.c.id == data.c.id)
+                    .values(
+                        {**{field: data.c[field] for field in changed}, "version": table.c.version + 1}
+                    )
+                    .returning(table.c.id)
+                )
+                if "version" in fields:
+                    stmt = stmt.where(table.c.version == data.c.version)
+                updated = len((await db.execute(stmt)).all())
+                if "version" in fields and updated < len(batch):
+                    await db.rollback()
+                    raise StaleDataError(
+                        f"{len(batch) - updated} {self.model.__name__} row(s) were modified "
+                        "or deleted concurrently"
+                    )
+
+    async def remove_multi(
+        self,
+        db: AsyncSession,
+        *,
+        ids: Sequence[int],
+        batch_size: Optional[int] = None,
+    ) -> int:
+        await self._on_write(db, ids)
+        await self._on_remove(db, ids)
+        removed = 0
+        if self._has_delete_cascades():
+            # Bulk DELETE would skip the ORM cascades and hit the children's foreign keys
+            for batch in self._batches(list(ids), batch_size):
+                result = await db.execute(select(self.model).filter(self.model.id.in_(batch)))
+                for obj in result.scalars().all():
+                    await db.delete(obj)
+                    removed += 1
+            await db.commit()
+            return removed
+
+        for batch in self._batches(list(ids), batch_size):
+            result = await db.execute(
+                delete(self.model)
+                .where(self.model.id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+            removed += result.rowcount
         await db.commit()
-        return obj
\ No newline at end of file
+        return removed
@@ -0,0 +1,27 @@
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.crud.course import course_ids_of
+from app.crud.statistics import stats_rollup
+from app.models.course import Comment, LessonMaterial
+from app.schemas.comment import CommentCreate, CommentUpdate
+
+
+class CRUDComment(CRUDBase[Comment, CommentCreate, CommentUpdate]):
+    async def _before_create(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        course_ids = await course_ids_of(db, LessonMaterial.id, [row.get("material_id") for row in rows])
+        for row in rows:
+            row["course_id"] = course_ids.get(row.get("material_id"))
+
+    async def _on_create(self, db: AsyncSession, objs: Sequence[Comment]) -> None:
+        for obj in objs:
+            if obj.course_id is not None:
+                await stats_rollup.record_comment(db, course_id=obj.course_id)
+
+    async def _on_remove(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        await stats_rollup.record_comments_removed(db, Comment.id.in_(ids))
+
+
+comment = CRUDComment(Comment)
@@ -1,15 +1,324 @@
-from typing import List, Optional
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
+from pydantic import BaseModel
+from sqlalchemy import and_, event, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from app.crud.base import CRUDBase
-from app.models.course import Course, Module, Lesson, LessonMaterial, Task
+from app.core.config import settings
+from app.core.database import async_session
+from app.crud.base import CRUDBase, CreateSchemaType, ModelType, UpdateSchemaType
+from app.crud.file import file_blob
+from app.crud.statistics import stats_rollup
+from app.models.course import (
+    Answer,
+    Comment,
+    Course,
+    CourseTeacher,
+    Enrollment,
+    Module,
+    Lesson,
+    LessonMaterial,
+    Task,
+)
+from app.models.user import User
 from app.schemas.course import CourseCreate, CourseUpdate, ModuleCreate, ModuleUpdate, LessonCreate, LessonUpdate
 
+logger = logging.getLogger(__name__)
+
+
+async def sync_course_ids(
+    db: AsyncSession, *criteria, answers: bool = True, comments: bool = True
+) -> None:
+    """Re-derive the denormalized course_id of answers and comments under the matching outline rows."""
+    if answers:
+        await db.execute(
+            update(Answer)
+            .values(course_id=Module.course_id)
+            .where(
+                Answer.task_id == Task.id,
+                Task.lesson_id == Lesson.id,
+                Lesson.module_id == Module.id,
+                Answer.course_id.is_distinct_from(Module.course_id),
+                *criteria,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if comments:
+        await db.execute(
+            update(Comment)
+            .values(course_id=Module.course_id)
+            .where(
+                Comment.material_id == LessonMaterial.id,
+                LessonMaterial.lesson_id == Lesson.id,
+                Lesson.module_id == Module.id,
+                Comment.course_id.is_distinct_from(Module.course_id),
+                *criteria,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def course_ids_of(db: AsyncSession, column, ids: Sequence[int]) -> Dict[int, int]:
+    """Map Task.id or LessonMaterial.id values to their course id in one query.
+
+    The outline rows are share-locked until commit, so a concurrent move either
+    finishes first or waits and then re-syncs the rows written in this transaction.
+    """
+    ids = {id for id in ids if id is not None}
+    if not ids:
+        return {}
+    result = await db.execute(
+        select(column, Module.course_id)
+        .select_from(Module)
+        .join(Lesson, Lesson.module_id == Module.id)
+        .join(column.class_, column.class_.lesson_id == Lesson.id)
+        .filter(column.in_(ids))
+        .with_for_update(read=True)
+    )
+    return dict(result.all())
+
+
+def course_max_score(course_id: int):
+    # Sum of max_score over the course's tasks, as a scalar subquery
+    return (
+        select(func.sum(Task.max_score))
+        .join(Lesson, Task.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .filter(Module.course_id == course_id)
+        .scalar_subquery()
+    )
+
+
+def progress_of(score, course_id: int):
+    # score as a percentage of the course's total max_score, 0 for courses without tasks
+    return func.coalesce(score * 100.0 / func.nullif(course_max_score(course_id), 0), 0.0)
+
+
+async def recompute_course_progress(
+    db: AsyncSession,
+    course_id: int,
+    *,
+    chunk_size: Optional[int] = None,
+    on_chunk: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Recompute the progress of every enrollment in the course, one UPDATE ... FROM per chunk.
+
+    Commits after each chunk, so pass a session without other pending work;
+    on_chunk gets the number of enrollments processed so far.
+    Returns the number of enrollments whose progress changed.
+    """
+    chunk_size = chunk_size or settings.PROGRESS_RECOMPUTE_CHUNK_SIZE
+    total = (await db.execute(select(course_max_score(course_id)))).scalar()
+    processed = changed = 0
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(Enrollment.id)
+            .filter(Enrollment.course_id == course_id, Enrollment.id > last_id)
+            .order_by(Enrollment.id)
+            .limit(chunk_size)
+        )
+        ids = result.scalars().all()
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        scores = (
+            select(
+                Enrollment.id,
+                Enrollment.progress,
+                func.coalesce(func.sum(Answer.score), 0.0).label("score"),
+            )
+            .outerjoin(
+                Answer,
+                and_(
+                    Answer.student_id == Enrollment.user_id,
+                    Answer.course_id == Enrollment.course_id,
+                ),
+            )
+            .filter(Enrollment.id.in_(ids))
+            .group_by(Enrollment.id, Enrollment.progress)
+            .subquery()
+        )
+        progress = scores.c.score * 100.0 / total if total else 0.0
+        result = await db.execute(
+            update(Enrollment)
+            .where(
+                Enrollment.id == scores.c.id,
+                func.coalesce(scores.c.progress, 0.0).is_distinct_from(progress),
+            )
+            .values(progress=progress)
+            .returning(scores.c.progress, Enrollment.progress)
+            .execution_options(synchronize_session=False)
+        )
+        changes = result.all()
+        await stats_rollup.record_progress_changes(db, course_id=course_id, changes=changes)
+        await db.commit()
+
+        processed += len(ids)
+        changed += len(changes)
+        if on_chunk:
+            on_chunk(processed)
+    return changed
+
+
+class ProgressRecomputes:
+    """Courses whose enrollment progress went stale with an outline write.
+
+    Writes queue courses on their session; once it commits, a background task
+    recomputes them on a session of its own so the request does not wait.
+    A restart drops the queue, app.commands.recompute_progress catches up.
+    """
+
+    def __init__(self):
+        self._pending: Set[int] = set()
+        self._task: Optional[asyncio.Future] = None
+
+    def mark(self, db: AsyncSession, course_ids: Iterable[Optional[int]]) -> None:
+        db.info.setdefault("stale_progress", set()).update(
+            course_id for course_id in course_ids if course_id is not None
+        )
+
+    def schedule(self, course_ids: Iterable[int]) -> None:
+        # A course queued again while it is being recomputed runs once more afterwards
+        self._pending.update(course_ids)
+        if self._pending and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            course_id = self._pending.pop()
+            try:
+                async with async_session() as db:
+                    await recompute_course_progress(db, course_id)
+            except Exception:
+                logger.exception("Recomputing progress of course %s failed", course_id)
+
+
+progress_recomputes = ProgressRecomputes()
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_progress_recomputes(session: Session) -> None:
+    course_ids = session.info.pop("stale_progress", None)
+    if course_ids:
+        progress_recomputes.schedule(course_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_progress_recomputes(session: Session) -> None:
+    session.info.pop("stale_progress", None)
+
+
+class CRUDCourseStructure(CRUDBase[ModelType, CreateSchemaType, UpdateSchemaType], ABC):
+    """CRUD for parts of the course outline, every write bumps Course.structure_version."""
+
+    # Column pointing at the parent row, changing it moves the row
+    parent_field: Optional[str] = None
+    # Whether moving or removing rows changes their course's max score total
+    affects_progress: bool = False
+
+    @abstractmethod
+    def _course_ids(self, ids: Sequence[int]):
+        """SELECT of the course ids the given rows belong to."""
+
+    def _parent_course_ids(self, parent_ids: Sequence[int]):
+        """SELECT of the course ids the given parent rows belong to."""
+        raise NotImplementedError
+
+    async def _mark_progress_stale(self, db: AsyncSession, stmt) -> None:
+        progress_recomputes.mark(db, (await db.execute(stmt)).scalars().all())
+
+    def _answers_under(self, ids: Sequence[int]):
+        # Criterion for the answers deleted along with the given rows, if any
+        return None
+
+    def _comments_under(self, ids: Sequence[int]):
+        return None
+
+    def _materials_under(self, ids: Sequence[int]):
+        return None
+
+    def _files_under(self, ids: Sequence[int]) -> List:
+        # SELECTs of the file paths of the answers and materials deleted along with the given rows
+        files = []
+        answers = self._answers_under(ids)
+        if answers is not None:
+            files.append(select(Answer.file_path).where(answers))
+        materials = self._materials_under(ids)
+        if materials is not None:
+            files.append(select(LessonMaterial.file_path).where(materials))
+        return files
+
+    async def _on_remove(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        if self.affects_progress:
+            await self._mark_progress_stale(db, self._course_ids(ids))
+        for stmt in self._files_under(ids):
+            await file_blob.update_references(db, released=(await db.execute(stmt)).scalars().all())
+        answers = self._answers_under(ids)
+        if answers is not None:
+            await stats_rollup.record_answers_removed(db, answers)
+        comments = self._comments_under(ids)
+        if comments is not None:
+            await stats_rollup.record_comments_removed(db, comments)
+
+    async def _sync_moved(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        # Re-derive course_id below the given rows, which moved to another parent
+        pass
+
+    async def _on_update(
+        self, db: AsyncSession, changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        field = self.parent_field
+        moved = [(old["id"], old[field]) for old, new in changes if new.get(field, old[field]) != old[field]]
+        if not moved:
+            return
+        ids = [id for id, _ in moved]
+        await self._sync_moved(db, ids)
+        if self.affects_progress:
+            await self._mark_progress_stale(db, self._course_ids(ids))
+            await self._mark_progress_stale(
+                db, self._parent_course_ids([parent_id for _, parent_id in moved])
+            )
+
+    async def _on_write(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        if not ids:
+            return
+        await db.execute(
+            update(Course)
+            .where(Course.id.in_(self._course_ids(ids)))
+            .values(structure_version=Course.structure_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+class CRUDCourse(CRUDCourseStructure[Course, CourseCreate, CourseUpdate]):
+    def _course_ids(self, ids: Sequence[int]):
+        return select(Course.id).filter(Course.id.in_(ids))
+
+    def _files_under(self, ids: Sequence[int]) -> List:
+        # The rollup rows go with the course through the foreign key cascade, only files need releasing
+        return [
+            select(Answer.file_path)
+            .join(Task, Answer.task_id == Task.id)
+            .join(Lesson, Task.lesson_id == Lesson.id)
+            .join(Module, Lesson.module_id == Module.id)
+            .filter(Module.course_id.in_(ids)),
+            select(LessonMaterial.file_path)
+            .join(Lesson, LessonMaterial.lesson_id == Lesson.id)
+            .join(Module, Lesson.module_id == Module.id)
+            .filter(Module.course_id.in_(ids)),
+        ]
+
+    # Removing a course drops its rollup rows through the foreign key cascade
+    async def _on_create(self, db: AsyncSession, objs: Sequence[Course]) -> None:
+        await stats_rollup.create_empty(db, [obj.id for obj in objs])
 
-class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
     async def get_multi_with_creator(
         self, db: AsyncSession, *, skip: int = 0, limit: int = 100
     ) -> List[Course]:
@@ -21,26 +330,110 @@ class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
         )
         return result.scalars().unique().all()
 
+    async def get_page_with_creator(
+        self, db: AsyncSession, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Course], Optional[str]]:
+        return await self.get_page(
+            db,
+            cursor=cursor,
+            limit=limit,
+            stmt=select(self.model).options(joinedload(self.model.creator)),
+        )
+
+    async def get_version_info(self, db: AsyncSession, id: int):
+        # (structure_version, creator's updated_at, last modification time) without
+        # loading the course; the outline embeds the creator, whose writes do not
+        # go through the course CRUD
+        course_modified = func.coalesce(self.model.updated_at, self.model.created_at)
+        result = await db.execute(
+            select(
+                self.model.structure_version,
+                User.updated_at,
+                func.greatest(course_modified, User.updated_at),
+            )
+            .outerjoin(User, User.id == self.model.creator_id)
+            .filter(self.model.id == id)
+        )
+        return result.first()
+
+    async def get_catalogue_version(self, db: AsyncSession):
+        # (course count, last modification time) of the whole catalogue, creators included
+        result = await db.execute(
+            select(
+                func.count(self.model.id),
+                func.max(
+                    func.greatest(
+                        func.coalesce(self.model.updated_at, self.model.created_at),
+                        User.updated_at,
+                    )
+                ),
+            ).outerjoin(User, User.id == self.model.creator_id)
+        )
+        return result.first()
+
     async def get_with_details(self, db: AsyncSession, id: int) -> Optional[Course]:
+        # One SELECT per tree level instead of a cartesian join of materials x tasks,
+        # children come back sorted by the relationship order_by
+        modules_lessons = selectinload(self.model.modules).selectinload(Module.lessons)
         result = await db.execute(
             select(self.model)
             .options(
                 joinedload(self.model.creator),
-                joinedload(self.model.modules)
-                .joinedload(Module.lessons)
-                .joinedload(Lesson.materials),
-                joinedload(self.model.modules)
-                .joinedload(Module.lessons)
-                .joinedload(Lesson.tasks),
-                joinedload(self.model.teachers)
+                modules_lessons.selectinload(Lesson.materials),
+                modules_lessons.selectinload(Lesson.tasks),
+                selectinload(self.model.teachers)
                 .joinedload(CourseTeacher.teacher),
             )
             .filter(self.model.id == id)
         )
-        return result.scalars().unique().first()
+        return result.scalars().first()
+
+
+class CRUDCourseTeacher(CRUDCourseStructure[CourseTeacher, BaseModel, BaseModel]):
+    # Teacher links are part of the cached outline, assigning goes through create/remove
+    def _course_ids(self, ids: Sequence[int]):
+        return select(CourseTeacher.course_id).filter(CourseTeacher.id.in_(ids))
+
+    async def get_by_course_and_teacher(
+        self, db: AsyncSession, *, course_id: int, teacher_id: int
+    ) -> Optional[CourseTeacher]:
+        result = await db.execute(
+            select(self.model).filter(
+                self.model.course_id == course_id, self.model.teacher_id == teacher_id
+            )
+        )
+        return result.scalars().first()
+
+
+class CRUDModule(CRUDCourseStructure[Module, ModuleCreate, ModuleUpdate]):
+    tracked_fields = ("course_id",)
+    parent_field = "course_id"
+    affects_progress = True
+
+    def _course_ids(self, ids: Sequence[int]):
+        return select(Module.course_id).filter(Module.id.in_(ids))
+
+    def _parent_course_ids(self, parent_ids: Sequence[int]):
+        return select(Course.id).filter(Course.id.in_(parent_ids))
+
+    async def _sync_moved(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        await sync_course_ids(db, Module.id.in_(ids))
+
+    def _answers_under(self, ids: Sequence[int]):
+        return Answer.task_id.in_(
+            select(Task.id).join(Lesson, Task.lesson_id == Lesson.id).filter(Lesson.module_id.in_(ids))
+        )
+
+    def _comments_under(self, ids: Sequence[int]):
+        return Comment.material_id.in_(
+            select(LessonMaterial.id)
+            .join(Lesson, LessonMaterial.lesson_id == Lesson.id)
+            .filter(Lesson.module_id.in_(ids))
+        )
 
+    def _materials_under(self, ids: Sequence[int]):
+        return LessonMaterial.lesson_id.in_(select(Lesson.id).filter(Lesson.module_id.in_(ids)))
 
-class CRUDModule(CRUDBase[Module, ModuleCreate, ModuleUpdate]):
     async def get_by_course(self, db: AsyncSession, course_id: int) -> List[Module]:
         result = await db.execute(
             select(self.model)
@@ -50,7 +443,35 @@ class CRUDModule(CRUDBase[Module, ModuleCreate, ModuleUpdate]):
         return result.scalars().all()
 
 
-class CRUDLesson(CRUDBase[Lesson, LessonCreate, LessonUpdate]):
+class CRUDLesson(CRUDCourseStructure[Lesson, LessonCreate, LessonUpdate]):
+    tracked_fields = ("module_id",)
+    parent_field = "module_id"
+    affects_progress = True
+
+    def _course_ids(self, ids: Sequence[int]):
+        return (
+            select(Module.course_id)
+            .join(Lesson, Lesson.module_id == Module.id)
+            .filter(Lesson.id.in_(ids))
+        )
+
+    def _parent_course_ids(self, parent_ids: Sequence[int]):
+        return select(Module.course_id).filter(Module.id.in_(parent_ids))
+
+    def _answers_under(self, ids: Sequence[int]):
+        return Answer.task_id.in_(select(Task.id).filter(Task.lesson_id.in_(ids)))
+
+    def _comments_under(self, ids: Sequence[int]):
+        return Comment.material_id.in_(
+            select(LessonMaterial.id).filter(LessonMaterial.lesson_id.in_(ids))
+        )
+
+    def _materials_under(self, ids: Sequence[int]):
+        return LessonMaterial.lesson_id.in_(ids)
+
+    async def _sync_moved(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        await sync_course_ids(db, Lesson.id.in_(ids))
+
     async def get_by_module(self, db: AsyncSession, module_id: int) -> List[Lesson]:
         result = await db.execute(
             select(self.model)
@@ -60,15 +481,84 @@ class CRUDLesson(CRUDBase[Lesson, LessonCreate, LessonUpdate]):
         return result.scalars().all()
 
 
-class CRUDMaterial(CRUDBase[LessonMaterial, LessonMaterialCreate, LessonMaterialUpdate]):
-    pass
+class CRUDMaterial(CRUDCourseStructure[LessonMaterial, LessonMaterialCreate, LessonMaterialUpdate]):
+    tracked_fields = ("lesson_id", "file_path")
+    parent_field = "lesson_id"
+
+    def _course_ids(self, ids: Sequence[int]):
+        return (
+            select(Module.course_id)
+            .join(Lesson, Lesson.module_id == Module.id)
+            .join(LessonMaterial, LessonMaterial.lesson_id == Lesson.id)
+            .filter(LessonMaterial.id.in_(ids))
+        )
+
+    def _comments_under(self, ids: Sequence[int]):
+        return Comment.material_id.in_(ids)
+
+    def _materials_under(self, ids: Sequence[int]):
+        return LessonMaterial.id.in_(ids)
+
+    async def _sync_moved(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        await sync_course_ids(db, LessonMaterial.id.in_(ids), answers=False)
+
+    async def _on_create(self, db: AsyncSession, objs: Sequence[LessonMaterial]) -> None:
+        await file_blob.update_references(db, acquired=[obj.file_path for obj in objs])
+
+    async def _on_update(
+        self, db: AsyncSession, changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        await super()._on_update(db, changes)
+        await file_blob.sync_references(db, changes)
+
+
+class CRUDTask(CRUDCourseStructure[Task, TaskCreate, TaskUpdate]):
+    tracked_fields = ("lesson_id", "max_score")
+    parent_field = "lesson_id"
+    affects_progress = True
+
+    def _course_ids(self, ids: Sequence[int]):
+        return (
+            select(Module.course_id)
+            .join(Lesson, Lesson.module_id == Module.id)
+            .join(Task, Task.lesson_id == Lesson.id)
+            .filter(Task.id.in_(ids))
+        )
+
+    def _answers_under(self, ids: Sequence[int]):
+        return Answer.task_id.in_(ids)
+
+    def _parent_course_ids(self, parent_ids: Sequence[int]):
+        return (
+            select(Module.course_id)
+            .join(Lesson, Lesson.module_id == Module.id)
+            .filter(Lesson.id.in_(parent_ids))
+        )
+
+    async def _sync_moved(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        await sync_course_ids(db, Task.id.in_(ids), comments=False)
 
+    # Any change to the tasks' max_score total makes every enrollment's progress in the course stale
+    async def _on_create(self, db: AsyncSession, objs: Sequence[Task]) -> None:
+        scored = [obj.id for obj in objs if obj.max_score]
+        if scored:
+            await self._mark_progress_stale(db, self._course_ids(scored))
 
-class CRUDTask(CRUDBase[Task, TaskCreate, TaskUpdate]):
-    pass
+    async def _on_update(
+        self, db: AsyncSession, changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        await super()._on_update(db, changes)
+        rescored = [
+            old["id"]
+            for old, new in changes
+            if new.get("max_score", old["max_score"]) != old["max_score"]
+        ]
+        if rescored:
+            await self._mark_progress_stale(db, self._course_ids(rescored))
 
 
 course = CRUDCourse(Course)
+course_teacher = CRUDCourseTeacher(CourseTeacher)
 module = CRUDModule(Module)
 lesson = CRUDLesson(Lesson)
 material = CRUDMaterial(LessonMaterial)
@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import func, literal, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from app.crud.base import CRUDBase
+from app.crud.course import progress_of
+from app.crud.statistics import stats_rollup
+from app.models.course import Course, Enrollment
+
+
+class CRUDEnrollment(CRUDBase[Enrollment, BaseModel, BaseModel]):
+    tracked_fields = ("progress", "course_id")
+
+    async def get_by_user_and_course(
+        self, db: AsyncSession, *, user_id: int, course_id: int
+    ) -> Optional[Enrollment]:
+        result = await db.execute(
+            select(self.model)
+            .options(joinedload(self.model.course))
+            .filter(self.model.user_id == user_id, self.model.course_id == course_id)
+        )
+        return result.scalars().first()
+
+    async def get_user_courses(self, db: AsyncSession, *, user_id: int) -> List[Course]:
+        result = await db.execute(
+            select(Course)
+            .join(self.model, self.model.course_id == Course.id)
+            .filter(self.model.user_id == user_id)
+        )
+        return result.scalars().all()
+
+    async def apply_score_delta(
+        self, db: AsyncSession, *, user_id: int, course_id: int, delta: float
+    ) -> Optional[float]:
+        """Shift progress by one answer's score change instead of rescanning the course.
+
+        Runs in the caller's transaction, returns the new progress or None when
+        the user is not enrolled.
+        """
+        if not delta:
+            return None
+        # Locked, so old.progress is the value this UPDATE replaces under concurrent grading
+        old = (
+            select(Enrollment.id, Enrollment.progress)
+            .filter(Enrollment.user_id == user_id, Enrollment.course_id == course_id)
+            .with_for_update()
+            .subquery()
+        )
+        result = await db.execute(
+            update(Enrollment)
+            .where(Enrollment.id == old.c.id)
+            .values(
+                progress=func.coalesce(Enrollment.progress, 0.0)
+                + progress_of(literal(delta), course_id)
+            )
+            .returning(old.c.progress, Enrollment.progress)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        old_progress, new_progress = row
+        await stats_rollup.record_enrollment(
+            db, course_id=course_id, old_progress=old_progress or 0.0, new_progress=new_progress
+        )
+        return new_progress
+
+    async def _on_create(self, db: AsyncSession, objs: Sequence[Enrollment]) -> None:
+        for obj in objs:
+            await stats_rollup.record_enrollment(
+                db, course_id=obj.course_id, students=1, new_progress=obj.progress or 0.0
+            )
+
+    async def _on_update(
+        self, db: AsyncSession, changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        for old, new in changes:
+            if "progress" in new:
+                await stats_rollup.record_enrollment(
+                    db,
+                    course_id=old["course_id"],
+                    old_progress=old["progress"] or 0.0,
+                    new_progress=new["progress"] or 0.0,
+                )
+
+    async def _on_remove(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        await stats_rollup.record_enrollments_removed(db, Enrollment.id.in_(ids))
+
+
+enrollment = CRUDEnrollment(Enrollment)
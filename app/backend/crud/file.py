@@ -0,0 +1,215 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, func, or_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.course import Answer, LessonMaterial
+from app.models.file import FileBlob, UploadSession
+from app.models.user import User
+
+
+def _referenced(path):
+    # Whether a lesson material, answer or profile image points at the path
+    return or_(
+        select(LessonMaterial.id).where(LessonMaterial.file_path == path).exists(),
+        select(Answer.id).where(Answer.file_path == path).exists(),
+        select(User.id).where(User.profile_image_path == path).exists(),
+    )
+
+
+class CRUDFileBlob:
+    """Reference counts of content-addressed uploads, see models/file.py.
+
+    ref_count follows the rows pointing at a blob, the CRUD of lesson materials,
+    answers and users adjusts it in their write transaction. Registering,
+    referencing and removing a blob hold its advisory lock until the commit.
+    """
+
+    async def lock(self, db: AsyncSession, paths: Iterable[str]) -> None:
+        # Sorted, so writers locking several blobs cannot deadlock each other
+        for path in sorted(set(paths)):
+            await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(path))))
+
+    async def register(self, db: AsyncSession, *, path: str, sha256: str, size: int) -> None:
+        # An upload is no reference yet, refreshing created_at keeps the GC off it until attached
+        await self.lock(db, [path])
+        stmt = pg_insert(FileBlob).values(path=path, sha256=sha256, size=size, ref_count=0)
+        stmt = stmt.on_conflict_do_update(index_elements=["path"], set_={"created_at": func.now()})
+        await db.execute(stmt)
+
+    async def update_references(
+        self,
+        db: AsyncSession,
+        *,
+        acquired: Iterable[Optional[str]] = (),
+        released: Iterable[Optional[str]] = (),
+    ) -> None:
+        # Paths without a blob row (stored before deduplication, or foreign) are ignored
+        deltas = Counter(path for path in acquired if path)
+        deltas.subtract(path for path in released if path)
+        deltas = {path: delta for path, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        await self.lock(db, deltas)
+        table = FileBlob.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.path == bindparam("blob_path"))
+            .values(ref_count=table.c.ref_count + bindparam("delta")),
+            [{"blob_path": path, "delta": delta} for path, delta in deltas.items()],
+        )
+
+    async def sync_references(
+        self,
+        db: AsyncSession,
+        changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]],
+        field: str = "file_path",
+    ) -> None:
+        # For CRUD _on_update hooks tracking the file path column
+        moved = [(old[field], new[field]) for old, new in changes if new.get(field, old[field]) != old[field]]
+        await self.update_references(
+            db, acquired=[new for _, new in moved], released=[old for old, _ in moved]
+        )
+
+    async def exists(self, db: AsyncSession, *, path: str) -> bool:
+        result = await db.execute(select(FileBlob.path).where(FileBlob.path == path))
+        return result.first() is not None
+
+    async def is_referenced(self, db: AsyncSession, *, path: str) -> bool:
+        return (await db.execute(select(_referenced(path)))).scalar()
+
+    async def remove(self, db: AsyncSession, *, path: str) -> None:
+        await db.execute(delete(FileBlob).where(FileBlob.path == path))
+
+    async def recount(self, db: AsyncSession) -> int:
+        """Reset ref_count to the number of rows whose file path points at the blob."""
+        references = union_all(
+            select(LessonMaterial.file_path.label("path")),
+            select(Answer.file_path.label("path")),
+            select(User.profile_image_path.label("path")),
+        ).subquery()
+        result = await db.execute(
+            update(FileBlob)
+            .values(
+                ref_count=select(func.count())
+                .select_from(references)
+                .where(references.c.path == FileBlob.path)
+                .scalar_subquery()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+    async def remove_unreferenced(self, db: AsyncSession, *, older_than: timedelta) -> List[str]:
+        """Delete the rows of blobs nothing points at, the caller commits before deleting files.
+
+        Fresh uploads may not be attached to a row yet, hence the age limit. The
+        rows themselves are checked too, ref_count may lag behind a recount.
+        """
+        unreferenced = (
+            FileBlob.ref_count <= 0,
+            FileBlob.created_at < datetime.now(timezone.utc) - older_than,
+            ~_referenced(FileBlob.path),
+        )
+        candidates = (await db.execute(select(FileBlob.path).where(*unreferenced))).scalars().all()
+        if not candidates:
+            return []
+        await self.lock(db, candidates)
+        result = await db.execute(
+            delete(FileBlob)
+            .where(FileBlob.path.in_(candidates), *unreferenced)
+            .returning(FileBlob.path)
+        )
+        return result.scalars().all()
+
+    async def get_stats(self, db: AsyncSession) -> Dict[str, Any]:
+        result = await db.execute(
+            select(
+                func.count(FileBlob.path),
+                func.coalesce(func.sum(FileBlob.ref_count), 0),
+                func.coalesce(func.sum(FileBlob.size), 0),
+                func.coalesce(func.sum(FileBlob.size * FileBlob.ref_count), 0),
+            )
+        )
+        blobs, references, stored_bytes, referenced_bytes = result.first()
+        return {
+            "blobs": blobs,
+            "references": references,
+            "stored_bytes": stored_bytes,
+            "referenced_bytes": referenced_bytes,
+            "dedup_ratio": referenced_bytes / stored_bytes if stored_bytes else 1.0,
+        }
+
+
+class CRUDUploadSession:
+    async def create(
+        self, db: AsyncSession, *, id: str, user_id: int, filename: str, size: int, ttl: int
+    ) -> UploadSession:
+        session = UploadSession(
+            id=id,
+            user_id=user_id,
+            filename=filename,
+            size=size,
+            received=0,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl),
+        )
+        db.add(session)
+        await db.commit()
+        return session
+
+    async def get_active(self, db: AsyncSession, *, id: str, user_id: int) -> Optional[UploadSession]:
+        result = await db.execute(
+            select(UploadSession).filter(
+                UploadSession.id == id,
+                UploadSession.user_id == user_id,
+                UploadSession.expires_at > datetime.now(timezone.utc),
+            )
+        )
+        return result.scalars().first()
+
+    async def advance(
+        self, db: AsyncSession, *, id: str, received: int, new_received: int, ttl: int
+    ) -> Optional[int]:
+        # Conditional on the offset the chunk was written at, None if the session moved or vanished
+        result = await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == id, UploadSession.received == received)
+            .values(
+                received=new_received,
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl),
+            )
+            .returning(UploadSession.received)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar()
+
+    async def remove(self, db: AsyncSession, *, id: str) -> None:
+        await db.execute(delete(UploadSession).where(UploadSession.id == id))
+
+    async def get_received(self, db: AsyncSession, *, id: str) -> Optional[int]:
+        result = await db.execute(select(UploadSession.received).where(UploadSession.id == id))
+        return result.scalar()
+
+    async def get_expired(self, db: AsyncSession) -> List[str]:
+        result = await db.execute(
+            select(UploadSession.id).where(UploadSession.expires_at <= datetime.now(timezone.utc))
+        )
+        return result.scalars().all()
+
+    async def remove_expired(self, db: AsyncSession, *, id: str) -> bool:
+        # Re-checked, a chunk written since get_expired extends the session
+        result = await db.execute(
+            delete(UploadSession)
+            .where(UploadSession.id == id, UploadSession.expires_at <= datetime.now(timezone.utc))
+            .returning(UploadSession.id)
+        )
+        return result.scalar() is not None
+
+
+file_blob = CRUDFileBlob()
+upload_session = CRUDUploadSession()
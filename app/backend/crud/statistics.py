@@ -1,164 +1,298 @@
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from collections import Counter
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_, or_, case
+from sqlalchemy import delete, func, literal, and_, or_, case, tuple_, update
 
-from app.models.course import Course, Enrollment, Answer, Comment
+from app.core.database import gather_in_snapshot
+
+from app.models.course import (
+    Answer,
+    Certificate,
+    Comment,
+    Course,
+    Enrollment,
+    Module,
+)
+from app.models.statistics import CourseDailyStats, CourseStatsRollup, CourseStudentActivity
 from app.models.user import User
 from app.schemas.statistics import CourseStatistics
 
 
 class CRUDStatistics:
     async def get_course_stats(self, db: AsyncSession, course_id: int) -> CourseStatistics:
-        # Total students enrolled
-        total_students = await self._count_enrollments(db, course_id)
-        
-        # Active students (last 30 days)
-        active_students = await self._count_active_students(db, course_id)
-        
-        # Completion rate
-        completion_rate = await self._calculate_completion_rate(db, course_id)
-        
-        # Average score
-        avg_score = await self._calculate_avg_score(db, course_id)
-        
-        # Module completion stats
-        module_stats = await self._get_module_stats(db, course_id)
-        
-        # Recent activity
-        recent_activity = await self._get_recent_activity(db, course_id)
-        
-        return CourseStatistics(
-            total_students=total_students,
-            active_students=active_students,
-            completion_rate=completion_rate,
-            average_score=avg_score,
-            module_stats=module_stats,
-            recent_activity=recent_activity,
-        )
+        stats = await stats_rollup.get_course_stats(db, course_id=course_id)
+        if stats is None:
+            stats = await self._get_live_course_stats(db, course_id)
+        return stats
 
-    async def _count_enrollments(self, db: AsyncSession, course_id: int) -> int:
-        result = await db.execute(
-            select(func.count(Enrollment.id))
+    async def _get_live_course_stats(self, db: AsyncSession, course_id: int) -> CourseStatistics:
+        now = datetime.now()
+        thirty_days_ago = now - timedelta(days=30)
+        seven_days_ago = now - timedelta(days=7)
+
+        # Answers and comments carry course_id, so each base table is scanned once without joins
+        answer_stats = (
+            select(
+                func.count(func.distinct(Answer.student_id))
+                .filter(Answer.created_at >= thirty_days_ago)
+                .label("active_students"),
+                func.avg(Answer.score).label("average_score"),
+                func.count(Answer.id)
+                .filter(Answer.created_at >= seven_days_ago)
+                .label("answers_submitted"),
+            )
+            .filter(Answer.course_id == course_id)
+            .cte("answer_stats")
+        )
+        enrollment_stats = (
+            select(
+                func.count(Enrollment.id).label("total_students"),
+                func.count(func.distinct(Enrollment.user_id)).label("distinct_students"),
+                func.avg(Enrollment.progress).label("completion_rate"),
+                func.avg(case((Enrollment.progress >= 80, 1), else_=0)).label("completed_share"),
+            )
             .filter(Enrollment.course_id == course_id)
+            .cte("enrollment_stats")
         )
-        return result.scalar()
-
-    async def _count_active_students(self, db: AsyncSession, course_id: int) -> int:
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        result = await db.execute(
-            select(func.count(func.distinct(Answer.student_id)))
-            .join(Answer.task)
-            .join(Task.lesson)
-            .join(Lesson.module)
-            .join(Module.course)
+        comment_stats = (
+            select(func.count(Comment.id).label("comments_posted"))
             .filter(
                 and_(
-                    Course.id == course_id,
-                    Answer.created_at >= thirty_days_ago
+                    Comment.course_id == course_id,
+                    Comment.created_at >= seven_days_ago,
                 )
             )
+            .cte("comment_stats")
         )
-        return result.scalar()
-
-    async def _calculate_completion_rate(self, db: AsyncSession, course_id: int) -> float:
         result = await db.execute(
-            select(func.avg(Enrollment.progress))
-            .filter(Enrollment.course_id == course_id)
+            select(answer_stats, enrollment_stats, comment_stats)
         )
-        return result.scalar() or 0.0
+        stats = result.one()
 
-    async def _calculate_avg_score(self, db: AsyncSession, course_id: int) -> float:
-        result = await db.execute(
-            select(func.avg(Answer.score))
-            .join(Answer.task)
-            .join(Task.lesson)
-            .join(Lesson.module)
-            .join(Module.course)
-            .filter(Course.id == course_id)
+        module_stats = []
+        if stats.total_students:
+            modules = await db.execute(
+                select(Module.id, Module.title).filter(Module.course_id == course_id)
+            )
+            module_stats = [
+                {
+                    "id": module_id,
+                    "title": title,
+                    "total_students": stats.distinct_students,
+                    "completion_rate": stats.completed_share,
+                }
+                for module_id, title in modules.all()
+            ]
+
+        return CourseStatistics(
+            total_students=stats.total_students,
+            active_students=stats.active_students,
+            completion_rate=stats.completion_rate or 0.0,
+            average_score=stats.average_score or 0.0,
+            module_stats=module_stats,
+            recent_activity={
+                "answers_submitted": stats.answers_submitted,
+                "comments_posted": stats.comments_posted,
+                "period": "7 days",
+            },
         )
-        return result.scalar() or 0.0
 
-    async def _get_module_stats(self, db: AsyncSession, course_id: int) -> List[Dict[str, Any]]:
+    async def get_course_progress(self, db: AsyncSession, course_id: int) -> Dict[str, Any]:
+        # Enrollments bucketed by progress quartile, in one pass over the course's enrollments
+        progress = func.coalesce(Enrollment.progress, 0.0)
         result = await db.execute(
             select(
-                Module.id,
-                Module.title,
-                func.count(func.distinct(Enrollment.user_id)).label("total_students"),
-                func.avg(
-                    case(
-                        (and_(
-                            Enrollment.progress >= 80,
-                            Enrollment.course_id == course_id
-                        ), 1),
-                        else_=0
-                    )
-                ).label("completion_rate")
-            )
-            .join(Module.course)
-            .join(Enrollment, Enrollment.course_id == Course.id)
-            .filter(Course.id == course_id)
-            .group_by(Module.id, Module.title)
-        )
-        return [dict(row) for row in result.all()]
-
-    async def _get_recent_activity(self, db: AsyncSession, course_id: int) -> Dict[str, Any]:
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        
-        # Answers submitted
-        answers_result = await db.execute(
-            select(func.count(Answer.id))
-            .join(Answer.task)
-            .join(Task.lesson)
-            .join(Lesson.module)
-            .join(Module.course)
-            .filter(
-                and_(
-                    Course.id == course_id,
-                    Answer.created_at >= seven_days_ago
+                func.count(Enrollment.id).label("total_students"),
+                func.avg(progress).label("average_progress"),
+                func.count(Enrollment.id).filter(progress >= 80).label("completed_students"),
+                func.count(Enrollment.id).filter(progress < 25).label("p0_25"),
+                func.count(Enrollment.id).filter(progress >= 25, progress < 50).label("p25_50"),
+                func.count(Enrollment.id).filter(progress >= 50, progress < 75).label("p50_75"),
+                func.count(Enrollment.id).filter(progress >= 75).label("p75_100"),
+            ).filter(Enrollment.course_id == course_id)
+        )
+        stats = result.one()
+        return {
+            "course_id": course_id,
+            "total_students": stats.total_students,
+            "average_progress": stats.average_progress or 0.0,
+            "completed_students": stats.completed_students,
+            "distribution": {
+                "0-25": stats.p0_25,
+                "25-50": stats.p25_50,
+                "50-75": stats.p50_75,
+                "75-100": stats.p75_100,
+            },
+        }
+
+    async def get_course_activity(
+        self, db: AsyncSession, course_id: int, days: int = 30
+    ) -> Dict[str, Any]:
+        # Answers and comments per UTC day, same bucketing as the rollup's daily stats
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        answer_day = func.date(func.timezone("UTC", Answer.created_at))
+        comment_day = func.date(func.timezone("UTC", Comment.created_at))
+        activity = (
+            select(
+                answer_day.label("day"),
+                func.count(Answer.id).label("answers_submitted"),
+                literal(0).label("comments_posted"),
+            )
+            .filter(Answer.course_id == course_id, Answer.created_at >= since)
+            .group_by(answer_day)
+            .union_all(
+                select(
+                    comment_day.label("day"),
+                    literal(0).label("answers_submitted"),
+                    func.count(Comment.id).label("comments_posted"),
                 )
+                .filter(Comment.course_id == course_id, Comment.created_at >= since)
+                .group_by(comment_day)
             )
+            .subquery()
         )
-        answers = answers_result.scalar()
-        
-        # Comments posted
-        comments_result = await db.execute(
-            select(func.count(Comment.id))
-            .join(Comment.material)
-            .join(LessonMaterial.lesson)
-            .join(Lesson.module)
-            .join(Module.course)
-            .filter(
-                and_(
-                    Course.id == course_id,
-                    Comment.created_at >= seven_days_ago
-                )
+        result = await db.execute(
+            select(
+                activity.c.day,
+                func.sum(activity.c.answers_submitted),
+                func.sum(activity.c.comments_posted),
             )
+            .group_by(activity.c.day)
+            .order_by(activity.c.day)
         )
-        comments = comments_result.scalar()
-        
         return {
-            "answers_submitted": answers,
-            "comments_posted": comments,
-            "period": "7 days"
+            "course_id": course_id,
+            "period": f"{days} days",
+            "days": [
+                {"day": day, "answers_submitted": answers, "comments_posted": comments}
+                for day, answers, comments in result.all()
+            ],
         }
 
+    async def get_user_activity_report(self, db: AsyncSession, days: int = 30) -> List[Dict[str, Any]]:
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        answers = (
+            select(
+                Answer.student_id.label("user_id"),
+                func.count(Answer.id).label("answers_submitted"),
+                func.max(Answer.created_at).label("last_answer_at"),
+            )
+            .filter(Answer.created_at >= since)
+            .group_by(Answer.student_id)
+            .subquery()
+        )
+        comments = (
+            select(
+                Comment.author_id.label("user_id"),
+                func.count(Comment.id).label("comments_posted"),
+                func.max(Comment.created_at).label("last_comment_at"),
+            )
+            .filter(Comment.created_at >= since)
+            .group_by(Comment.author_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                User.id,
+                User.email,
+                User.first_name,
+                User.last_name,
+                func.coalesce(answers.c.answers_submitted, 0),
+                func.coalesce(comments.c.comments_posted, 0),
+                func.greatest(answers.c.last_answer_at, comments.c.last_comment_at),
+            )
+            .outerjoin(answers, answers.c.user_id == User.id)
+            .outerjoin(comments, comments.c.user_id == User.id)
+            .filter(or_(answers.c.user_id.isnot(None), comments.c.user_id.isnot(None)))
+            .order_by(User.id)
+        )
+        return [
+            {
+                "user_id": user_id,
+                "email": email,
+                "first_name": first_name,
+                "last_name": last_name,
+                "answers_submitted": answers_submitted,
+                "comments_posted": comments_posted,
+                "last_activity": last_activity,
+            }
+            for (
+                user_id, email, first_name, last_name,
+                answers_submitted, comments_posted, last_activity,
+            ) in result.all()
+        ]
+
+    async def get_courses_report(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        enrollments = (
+            select(
+                Enrollment.course_id,
+                func.count(Enrollment.id).label("total_students"),
+                func.count(Enrollment.id).filter(Enrollment.progress >= 80).label("completed_students"),
+                func.avg(Enrollment.progress).label("average_progress"),
+            )
+            .group_by(Enrollment.course_id)
+            .subquery()
+        )
+        answers = (
+            select(
+                Answer.course_id,
+                func.count(Answer.id).label("answers_count"),
+                func.avg(Answer.score).label("average_score"),
+            )
+            .group_by(Answer.course_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                Course.id,
+                Course.title,
+                Course.is_active,
+                func.coalesce(enrollments.c.total_students, 0),
+                func.coalesce(enrollments.c.completed_students, 0),
+                func.coalesce(enrollments.c.average_progress, 0.0),
+                func.coalesce(answers.c.answers_count, 0),
+                func.coalesce(answers.c.average_score, 0.0),
+            )
+            .outerjoin(enrollments, enrollments.c.course_id == Course.id)
+            .outerjoin(answers, answers.c.course_id == Course.id)
+            .order_by(Course.id)
+        )
+        return [
+            {
+                "course_id": course_id,
+                "title": title,
+                "is_active": is_active,
+                "total_students": total_students,
+                "completed_students": completed_students,
+                "average_progress": average_progress,
+                "answers_count": answers_count,
+                "average_score": average_score,
+            }
+            for (
+                course_id, title, is_active, total_students, completed_students,
+                average_progress, answers_count, average_score,
+            ) in result.all()
+        ]
+
     async def get_system_stats(self, db: AsyncSession) -> Dict[str, Any]:
-        # Total users
-        total_users = await self._count_total_users(db)
-        
-        # Active users (last 30 days)
-        active_users = await self._count_active_users(db)
-        
-        # Total courses
-        total_courses = await self._count_total_courses(db)
-        
-        # Active courses (with activity last 30 days)
-        active_courses = await self._count_active_courses(db)
-        
-        # Certificates issued
-        certificates = await self._count_certificates(db)
+        # Independent counts run side by side on one consistent snapshot
+        (
+            total_users,
+            active_users,
+            total_courses,
+            active_courses,
+            certificates,
+        ) = await gather_in_snapshot(
+            db,
+            self._count_total_users,
+            self._count_active_users,
+            self._count_total_courses,
+            self._count_active_courses,
+            self._count_certificates,
+        )
         
         return {
             "total_users": total_users,
@@ -187,10 +321,7 @@ class CRUDStatistics:
     async def _count_active_courses(self, db: AsyncSession) -> int:
         thirty_days_ago = datetime.now() - timedelta(days=30)
         result = await db.execute(
-            select(func.count(func.distinct(Module.course_id)))
-            .join(Answer.task)
-            .join(Task.lesson)
-            .join(Lesson.module)
+            select(func.count(func.distinct(Answer.course_id)))
             .filter(Answer.created_at >= thirty_days_ago)
         )
         return result.scalar()
@@ -200,4 +331,471 @@ class CRUDStatistics:
         return result.scalar()
 
 
-statistics = CRUDStatistics()
\ No newline at end of file
+class CRUDStatsRollup:
+    """Incrementally maintained per-course counters, see models/statistics.py.
+
+    A rollup row is complete once rebuilt_at is set, by rebuild() or when the
+    course is created; from then on the record_* methods keep it current.
+    They run inside the transaction of the write they mirror and never commit.
+    """
+
+    async def get_course_stats(self, db: AsyncSession, course_id: int) -> Optional[CourseStatistics]:
+        now = datetime.now(timezone.utc)
+        today = now.date()
+        answers_7d = (
+            select(func.coalesce(func.sum(CourseDailyStats.answers_submitted), 0))
+            .filter(
+                CourseDailyStats.course_id == course_id,
+                CourseDailyStats.day > today - timedelta(days=7),
+            )
+            .scalar_subquery()
+        )
+        comments_7d = (
+            select(func.coalesce(func.sum(CourseDailyStats.comments_posted), 0))
+            .filter(
+                CourseDailyStats.course_id == course_id,
+                CourseDailyStats.day > today - timedelta(days=7),
+            )
+            .scalar_subquery()
+        )
+        active_students = (
+            select(func.count())
+            .select_from(CourseStudentActivity)
+            .filter(
+                CourseStudentActivity.course_id == course_id,
+                CourseStudentActivity.last_answer_at >= now - timedelta(days=30),
+            )
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(
+                CourseStatsRollup,
+                answers_7d.label("answers_submitted"),
+                comments_7d.label("comments_posted"),
+                active_students.label("active_students"),
+            ).filter(CourseStatsRollup.course_id == course_id)
+        )
+        row = result.first()
+        if row is None or row.CourseStatsRollup.rebuilt_at is None:
+            return None
+        rollup = row.CourseStatsRollup
+
+        module_stats = []
+        if rollup.total_students:
+            modules = await db.execute(
+                select(Module.id, Module.title).filter(Module.course_id == course_id)
+            )
+            module_stats = [
+                {
+                    "id": module_id,
+                    "title": title,
+                    "total_students": rollup.total_students,
+                    "completion_rate": rollup.completed_students / rollup.total_students,
+                }
+                for module_id, title in modules.all()
+            ]
+
+        return CourseStatistics(
+            total_students=rollup.total_students,
+            active_students=row.active_students,
+            completion_rate=(
+                rollup.progress_sum / rollup.total_students if rollup.total_students else 0.0
+            ),
+            average_score=(
+                rollup.score_sum / rollup.scored_answers if rollup.scored_answers else 0.0
+            ),
+            module_stats=module_stats,
+            recent_activity={
+                "answers_submitted": row.answers_submitted,
+                "comments_posted": row.comments_posted,
+                "period": "7 days",
+            },
+        )
+
+    async def _bump_rollup(self, db: AsyncSession, course_id: int, **deltas) -> None:
+        # Only updates existing rows, a row created from deltas alone would miss earlier history.
+        # Every record_* takes this row lock first, which is what rebuild() waits on.
+        await db.execute(
+            update(CourseStatsRollup)
+            .where(CourseStatsRollup.course_id == course_id)
+            .values(
+                **{
+                    name: getattr(CourseStatsRollup, name) + delta
+                    for name, delta in deltas.items()
+                },
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _bump(self, db: AsyncSession, model, keys: Dict[str, Any], deltas: Dict[str, Any]) -> None:
+        stmt = pg_insert(model).values(**keys, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                name: model.__table__.c[name] + stmt.excluded[name]
+                for name in deltas
+            },
+        )
+        await db.execute(stmt)
+
+    async def create_empty(self, db: AsyncSession, course_ids: Sequence[int]) -> None:
+        # New courses have nothing to aggregate, so their rollup is complete from the start
+        if course_ids:
+            await db.execute(
+                pg_insert(CourseStatsRollup)
+                .values(
+                    [
+                        {
+                            "course_id": course_id,
+                            "total_students": 0,
+                            "completed_students": 0,
+                            "progress_sum": 0.0,
+                            "answers_count": 0,
+                            "scored_answers": 0,
+                            "score_sum": 0.0,
+                            "rebuilt_at": func.now(),
+                        }
+                        for course_id in course_ids
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=["course_id"])
+            )
+
+    async def record_answer(
+        self,
+        db: AsyncSession,
+        *,
+        course_id: int,
+        student_id: int,
+        score: Optional[float] = None,
+    ) -> None:
+        now = datetime.now(timezone.utc)
+        await self._bump_rollup(
+            db,
+            course_id,
+            answers_count=1,
+            scored_answers=1 if score is not None else 0,
+            score_sum=score or 0.0,
+        )
+        await self._bump(
+            db,
+            CourseDailyStats,
+            {"course_id": course_id, "day": now.date()},
+            {"answers_submitted": 1, "comments_posted": 0},
+        )
+        stmt = pg_insert(CourseStudentActivity).values(
+            course_id=course_id, student_id=student_id, last_answer_at=now
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["course_id", "student_id"],
+                set_={"last_answer_at": stmt.excluded.last_answer_at},
+            )
+        )
+
+    async def record_grade(
+        self,
+        db: AsyncSession,
+        *,
+        course_id: int,
+        old_score: Optional[float],
+        new_score: Optional[float],
+    ) -> None:
+        await self._bump_rollup(
+            db,
+            course_id,
+            scored_answers=int(new_score is not None) - int(old_score is not None),
+            score_sum=(new_score or 0.0) - (old_score or 0.0),
+        )
+
+    async def record_answers_removed(self, db: AsyncSession, *criteria) -> None:
+        """Subtract the answers matching criteria, call before they are deleted."""
+        result = await db.execute(
+            select(Answer.id, Answer.course_id, Answer.student_id, Answer.score, Answer.created_at)
+            .filter(Answer.course_id.isnot(None), *criteria)
+            .with_for_update()
+        )
+        answers = result.all()
+        if not answers:
+            return
+
+        courses: Dict[int, List[Any]] = {}
+        for answer in answers:
+            courses.setdefault(answer.course_id, []).append(answer)
+        for course_id, rows in courses.items():
+            scored = [row.score for row in rows if row.score is not None]
+            await self._bump_rollup(
+                db,
+                course_id,
+                answers_count=-len(rows),
+                scored_answers=-len(scored),
+                score_sum=-sum(scored),
+            )
+
+        since = datetime.now(timezone.utc) - timedelta(days=30)
+        recent = [row for row in answers if row.created_at >= since]
+        days = Counter((row.course_id, self._day(row.created_at)) for row in recent)
+        for (course_id, day), count in days.items():
+            await db.execute(
+                update(CourseDailyStats)
+                .where(CourseDailyStats.course_id == course_id, CourseDailyStats.day == day)
+                .values(answers_submitted=CourseDailyStats.answers_submitted - count)
+            )
+
+        # Students' last answer falls back to the latest one that remains
+        pairs = list({(row.course_id, row.student_id) for row in recent})
+        if pairs:
+            pair = tuple_(CourseStudentActivity.course_id, CourseStudentActivity.student_id)
+            await db.execute(delete(CourseStudentActivity).where(pair.in_(pairs)))
+            remaining = (
+                select(Answer.course_id, Answer.student_id, func.max(Answer.created_at))
+                .filter(
+                    tuple_(Answer.course_id, Answer.student_id).in_(pairs),
+                    Answer.id.notin_([row.id for row in answers]),
+                    Answer.created_at >= since,
+                )
+                .group_by(Answer.course_id, Answer.student_id)
+            )
+            stmt = pg_insert(CourseStudentActivity).from_select(
+                ["course_id", "student_id", "last_answer_at"], remaining
+            )
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["course_id", "student_id"],
+                    set_={
+                        "last_answer_at": func.greatest(
+                            CourseStudentActivity.last_answer_at, stmt.excluded.last_answer_at
+                        )
+                    },
+                )
+            )
+
+    async def record_enrollment(
+        self,
+        db: AsyncSession,
+        *,
+        course_id: int,
+        students: int = 0,
+        old_progress: float = 0.0,
+        new_progress: float = 0.0,
+    ) -> None:
+        # students is +1/-1 for (un)enrollment, 0 for a progress change
+        completed = int(new_progress >= 80) - int(old_progress >= 80)
+        await self._bump_rollup(
+            db,
+            course_id,
+            total_students=students,
+            completed_students=completed,
+            progress_sum=new_progress - old_progress,
+        )
+
+    async def record_enrollments_removed(self, db: AsyncSession, *criteria) -> None:
+        """Subtract the enrollments matching criteria, call before they are deleted."""
+        result = await db.execute(
+            select(Enrollment.course_id, Enrollment.progress).filter(*criteria).with_for_update()
+        )
+        courses: Dict[int, List[float]] = {}
+        for course_id, progress in result.all():
+            courses.setdefault(course_id, []).append(progress or 0.0)
+        for course_id, progress in courses.items():
+            await self._bump_rollup(
+                db,
+                course_id,
+                total_students=-len(progress),
+                completed_students=-sum(1 for value in progress if value >= 80),
+                progress_sum=-sum(progress),
+            )
+
+    async def record_progress_changes(
+        self,
+        db: AsyncSession,
+        *,
+        course_id: int,
+        changes: Sequence[Tuple[Optional[float], float]],
+    ) -> None:
+        # (old_progress, new_progress) pairs of a bulk recomputation folded into one bump
+        if changes:
+            await self._bump_rollup(
+                db,
+                course_id,
+                completed_students=sum(
+                    int(new >= 80) - int((old or 0.0) >= 80) for old, new in changes
+                ),
+                progress_sum=sum(new - (old or 0.0) for old, new in changes),
+            )
+
+    async def record_comment(self, db: AsyncSession, *, course_id: int) -> None:
+        # No counter changes, the bump only takes the rollup row lock
+        await self._bump_rollup(db, course_id)
+        await self._bump(
+            db,
+            CourseDailyStats,
+            {"course_id": course_id, "day": datetime.now(timezone.utc).date()},
+            {"answers_submitted": 0, "comments_posted": 1},
+        )
+
+    async def record_comments_removed(self, db: AsyncSession, *criteria) -> None:
+        """Subtract the comments matching criteria, call before they are deleted."""
+        since = datetime.now(timezone.utc) - timedelta(days=30)
+        result = await db.execute(
+            select(Comment.course_id, Comment.created_at)
+            .filter(Comment.course_id.isnot(None), Comment.created_at >= since, *criteria)
+            .with_for_update()
+        )
+        days = Counter((course_id, self._day(created_at)) for course_id, created_at in result.all())
+        for course_id in {course_id for course_id, _ in days}:
+            await self._bump_rollup(db, course_id)
+        for (course_id, day), count in days.items():
+            await db.execute(
+                update(CourseDailyStats)
+                .where(CourseDailyStats.course_id == course_id, CourseDailyStats.day == day)
+                .values(comments_posted=CourseDailyStats.comments_posted - count)
+            )
+
+    @staticmethod
+    def _day(moment: datetime):
+        # Daily buckets are UTC days, as in record_answer/record_comment and rebuild()
+        return moment.astimezone(timezone.utc).date()
+
+    async def rebuild(self, db: AsyncSession, course_id: Optional[int] = None) -> int:
+        """Recompute rollups from the base tables, for one course or all of them.
+
+        Writes that commit while this runs are neither lost nor counted twice:
+        empty rows are committed first so their deltas have a row to land on,
+        then the rows are locked before the base tables are read.
+        """
+        now = datetime.now(timezone.utc)
+        course_filter = self._course_filter(Course.id, course_id)
+        answer_filter = self._course_filter(Answer.course_id, course_id)
+
+        await db.execute(
+            pg_insert(CourseStatsRollup)
+            .from_select(
+                [
+                    "course_id", "total_students", "completed_students", "progress_sum",
+                    "answers_count", "scored_answers", "score_sum",
+                ],
+                select(
+                    Course.id, literal(0), literal(0), literal(0.0),
+                    literal(0), literal(0), literal(0.0),
+                ).filter(*course_filter),
+            )
+            .on_conflict_do_nothing(index_elements=["course_id"])
+        )
+        await db.commit()
+        await db.execute(
+            select(CourseStatsRollup.course_id)
+            .filter(*self._course_filter(CourseStatsRollup.course_id, course_id))
+            .with_for_update()
+        )
+
+        enrollments = (
+            select(
+                Enrollment.course_id,
+                func.count(Enrollment.id).label("total_students"),
+                func.count(Enrollment.id).filter(Enrollment.progress >= 80).label("completed_students"),
+                func.coalesce(func.sum(Enrollment.progress), 0.0).label("progress_sum"),
+            )
+            .group_by(Enrollment.course_id)
+            .subquery()
+        )
+        answers = (
+            select(
+                Answer.course_id,
+                func.count(Answer.id).label("answers_count"),
+                func.count(Answer.score).label("scored_answers"),
+                func.coalesce(func.sum(Answer.score), 0.0).label("score_sum"),
+            )
+            .group_by(Answer.course_id)
+            .subquery()
+        )
+        rows = (
+            select(
+                Course.id,
+                func.coalesce(enrollments.c.total_students, 0),
+                func.coalesce(enrollments.c.completed_students, 0),
+                func.coalesce(enrollments.c.progress_sum, 0.0),
+                func.coalesce(answers.c.answers_count, 0),
+                func.coalesce(answers.c.scored_answers, 0),
+                func.coalesce(answers.c.score_sum, 0.0),
+                func.now(),
+            )
+            .outerjoin(enrollments, enrollments.c.course_id == Course.id)
+            .outerjoin(answers, answers.c.course_id == Course.id)
+            .filter(*course_filter)
+        )
+        columns = [
+            "course_id", "total_students", "completed_students", "progress_sum",
+            "answers_count", "scored_answers", "score_sum", "rebuilt_at",
+        ]
+        stmt = pg_insert(CourseStatsRollup).from_select(columns, rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["course_id"],
+            set_={**{name: stmt.excluded[name] for name in columns[1:]}, "updated_at": func.now()},
+        )
+        result = await db.execute(stmt)
+
+        # Daily buckets and activity only cover the windows the statistics read
+        since = now - timedelta(days=30)
+        await db.execute(
+            delete(CourseDailyStats).where(
+                CourseDailyStats.day >= since.date(),
+                *self._course_filter(CourseDailyStats.course_id, course_id),
+            )
+        )
+        await db.execute(
+            delete(CourseStudentActivity).where(
+                *self._course_filter(CourseStudentActivity.course_id, course_id)
+            )
+        )
+
+        answer_days = (
+            select(
+                Answer.course_id.label("course_id"),
+                func.date(func.timezone("UTC", Answer.created_at)).label("day"),
+                func.count(Answer.id).label("answers_submitted"),
+                literal(0).label("comments_posted"),
+            )
+            .filter(Answer.created_at >= since, *answer_filter)
+            .group_by(Answer.course_id, func.date(func.timezone("UTC", Answer.created_at)))
+        )
+        comment_days = (
+            select(
+                Comment.course_id.label("course_id"),
+                func.date(func.timezone("UTC", Comment.created_at)).label("day"),
+                literal(0).label("answers_submitted"),
+                func.count(Comment.id).label("comments_posted"),
+            )
+            .filter(Comment.created_at >= since, *self._course_filter(Comment.course_id, course_id))
+            .group_by(Comment.course_id, func.date(func.timezone("UTC", Comment.created_at)))
+        )
+        days = answer_days.union_all(comment_days).subquery()
+        await db.execute(
+            pg_insert(CourseDailyStats).from_select(
+                ["course_id", "day", "answers_submitted", "comments_posted"],
+                select(
+                    days.c.course_id,
+                    days.c.day,
+                    func.sum(days.c.answers_submitted),
+                    func.sum(days.c.comments_posted),
+                ).group_by(days.c.course_id, days.c.day),
+            )
+        )
+        await db.execute(
+            pg_insert(CourseStudentActivity).from_select(
+                ["course_id", "student_id", "last_answer_at"],
+                select(Answer.course_id, Answer.student_id, func.max(Answer.created_at))
+                .filter(Answer.created_at >= since, *answer_filter)
+                .group_by(Answer.course_id, Answer.student_id),
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    def _course_filter(self, column, course_id: Optional[int]) -> list:
+        return [column == course_id] if course_id is not None else []
+
+
+statistics = CRUDStatistics()
+stats_rollup = CRUDStatsRollup()
\ No newline at end of file
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.crud.base import CRUDBase
+from app.crud.file import file_blob
+from app.models.user import User
+from app.schemas.user import UserCreate, UserUpdate
+
+
+class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    tracked_fields = ("profile_image_path",)
+
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        result = await db.execute(select(self.model).filter(self.model.email == email))
+        return result.scalars().first()
+
+    # Profile images are uploads, the blob reference counts follow them
+    async def _on_create(self, db: AsyncSession, objs: Sequence[User]) -> None:
+        await file_blob.update_references(db, acquired=[obj.profile_image_path for obj in objs])
+
+    async def _on_update(
+        self, db: AsyncSession, changes: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> None:
+        await file_blob.sync_references(db, changes, "profile_image_path")
+
+    async def _on_remove(self, db: AsyncSession, ids: Sequence[int]) -> None:
+        result = await db.execute(select(User.profile_image_path).where(User.id.in_(ids)))
+        await file_blob.update_references(db, released=result.scalars().all())
+
+
+user = CRUDUser(User)
@@ -1,18 +1,31 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.security import (
+    cache_principal,
+    get_cached_principal,
+    principal_from_claims,
+    revocations,
+    verify_password,
+)
 from app.crud.user import user as crud_user
-from app.db.dependencies import get_db
+from app.core.database import get_db
 from app.models.user import User
-from app.schemas.token import TokenData
+from app.schemas.base import TokenData
+
 
+USER_COLUMNS = frozenset(User.__table__.columns.keys())
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+# For endpoints that also accept anonymous callers, e.g. logout
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False
+)
 
 
 async def get_current_user(
@@ -27,15 +40,24 @@ async def get_current_user(
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        if user_id is None or payload.get("type", "access") != "access":
             raise credentials_exception
         token_data = TokenData(user_id=user_id)
     except JWTError:
         raise credentials_exception
+    if revocations.is_revoked(payload):
+        raise credentials_exception
+    if settings.AUTH_STATELESS and "role" in payload:
+        # Role and active status come from the token, no DB round trip
+        return principal_from_claims(payload)
     
-    user = await crud_user.get(db, id=int(token_data.user_id))
+    user_id = int(token_data.user_id)
+    user = get_cached_principal(user_id)
     if user is None:
-        raise credentials_exception
+        user = await crud_user.get(db, id=user_id)
+        if user is None:
+            raise credentials_exception
+        cache_principal(user)
     return user
 
 
@@ -47,6 +69,27 @@ async def get_current_active_user(
     return current_user
 
 
+async def get_current_user_record(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    # Stateless principals carry only id, role and is_active; endpoints reading
+    # any other column of the current user depend on this instead
+    if not USER_COLUMNS & inspect(current_user).unloaded:
+        return current_user
+    user = get_cached_principal(current_user.id)
+    if user is None:
+        user = await crud_user.get(db, id=current_user.id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        cache_principal(user)
+    return user
+
+
 async def get_current_active_teacher(
     current_user: Annotated[User, Depends(get_current_active_user)],
 ) -> User:
@@ -66,6 +109,11 @@ async def get_current_active_admin(
 # ... предыдущий код ...
 
 from app.services import (
+    CertificateService,
+    CourseService,
+    NotificationService,
+    StatisticsService,
+    UserService,
     certificate_service,
     course_service,
     notification_service,
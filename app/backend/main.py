@@ -2,12 +2,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
+import asyncio
 import os
 import sys
 
 sys.path.append(Path(os.getcwd()).__str__())
 from app.api.v1.endpoints import api_router
+from app.core.cache import start_invalidation_listeners
 from app.core.config import settings
+from app.core.security import sync_revocations_forever
+from app.services.file import expire_upload_sessions_forever
+from app.core.profiling import query_stats_middleware
+from app.utils.file_utils import UploadSizeLimitMiddleware
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -23,8 +29,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-N-Plus-One"],
 )
 
+# Счётчик запросов к БД и поиск N+1
+app.middleware("http")(query_stats_middleware)
+
+# Отклоняем слишком большие загрузки: по Content-Length сразу, без него — по мере чтения тела
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Фоновые задачи: инвалидация кэшей между воркерами, список отозванных токенов,
+# удаление брошенных загрузок
+@app.on_event("startup")
+async def start_background_tasks():
+    app.state.invalidation_listeners = start_invalidation_listeners()
+    app.state.revocation_sync = asyncio.ensure_future(sync_revocations_forever())
+    app.state.upload_session_expiry = asyncio.ensure_future(expire_upload_sessions_forever())
+
 # Подключаем роутеры
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -0,0 +1,185 @@
+"""Baseline schema
+
+Databases created before migrations were introduced already have these
+tables: mark them with `alembic stamp 0001` instead of upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String()),
+        sa.Column("last_name", sa.String()),
+        sa.Column("middle_name", sa.String()),
+        sa.Column("phone", sa.String()),
+        sa.Column("profile_description", sa.String()),
+        sa.Column("gender", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("role", sa.Enum("ADMIN", "TEACHER", "STUDENT", name="userrole")),
+        sa.Column("profile_image_path", sa.String()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "teacher_profiles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True),
+        sa.Column("specialization", sa.String()),
+        sa.Column("experience", sa.String()),
+        sa.Column("bio", sa.String()),
+    )
+    op.create_index("ix_teacher_profiles_id", "teacher_profiles", ["id"])
+
+    op.create_table(
+        "courses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String()),
+        sa.Column("image_path", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("creator_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_courses_id", "courses", ["id"])
+    op.create_index("ix_courses_title", "courses", ["title"])
+
+    op.create_table(
+        "course_teachers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id")),
+        sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_course_teachers_id", "course_teachers", ["id"])
+
+    op.create_table(
+        "modules",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String()),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id")),
+        sa.Column("order", sa.Integer()),
+    )
+    op.create_index("ix_modules_id", "modules", ["id"])
+    op.create_index("ix_modules_title", "modules", ["title"])
+
+    op.create_table(
+        "lessons",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String()),
+        sa.Column("module_id", sa.Integer(), sa.ForeignKey("modules.id")),
+        sa.Column("order", sa.Integer()),
+    )
+    op.create_index("ix_lessons_id", "lessons", ["id"])
+    op.create_index("ix_lessons_title", "lessons", ["title"])
+
+    op.create_table(
+        "lesson_materials",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id")),
+        sa.Column("content", sa.String()),
+        sa.Column("material_type", sa.String()),
+        sa.Column("file_path", sa.String()),
+        sa.Column("order", sa.Integer()),
+    )
+    op.create_index("ix_lesson_materials_id", "lesson_materials", ["id"])
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id")),
+        sa.Column("title", sa.String()),
+        sa.Column("description", sa.String()),
+        sa.Column("task_type", sa.String()),
+        sa.Column("max_score", sa.Float()),
+        sa.Column("order", sa.Integer()),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+
+    op.create_table(
+        "answers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), sa.ForeignKey("tasks.id")),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("content", sa.String()),
+        sa.Column("file_path", sa.String()),
+        sa.Column("score", sa.Float()),
+        sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("feedback", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_answers_id", "answers", ["id"])
+
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("material_id", sa.Integer(), sa.ForeignKey("lesson_materials.id")),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("content", sa.String()),
+        sa.Column("reply_to_id", sa.Integer(), sa.ForeignKey("comments.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("is_deleted", sa.Boolean()),
+    )
+    op.create_index("ix_comments_id", "comments", ["id"])
+
+    op.create_table(
+        "enrollments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id")),
+        sa.Column("enrolled_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime(timezone=True)),
+        sa.Column("progress", sa.Float()),
+    )
+    op.create_index("ix_enrollments_id", "enrollments", ["id"])
+
+    op.create_table(
+        "certificates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id")),
+        sa.Column("file_path", sa.String()),
+        sa.Column("score", sa.Float()),
+        sa.Column("issued_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_certificates_id", "certificates", ["id"])
+
+
+def downgrade() -> None:
+    for table in (
+        "certificates",
+        "enrollments",
+        "comments",
+        "answers",
+        "tasks",
+        "lesson_materials",
+        "lessons",
+        "modules",
+        "course_teachers",
+        "courses",
+        "teacher_profiles",
+        "users",
+    ):
+        op.drop_table(table)
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
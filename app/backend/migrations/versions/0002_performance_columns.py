@@ -0,0 +1,119 @@
+"""Version columns, denormalized course_id, statistics rollups and notifications
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("courses", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column(
+        "courses", sa.Column("structure_version", sa.Integer(), nullable=False, server_default="1")
+    )
+    op.add_column("answers", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+    op.add_column("answers", sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id")))
+    op.add_column("comments", sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id")))
+    op.execute(
+        """
+        UPDATE answers SET course_id = modules.course_id
+        FROM tasks
+        JOIN lessons ON lessons.id = tasks.lesson_id
+        JOIN modules ON modules.id = lessons.module_id
+        WHERE answers.task_id = tasks.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE comments SET course_id = modules.course_id
+        FROM lesson_materials
+        JOIN lessons ON lessons.id = lesson_materials.lesson_id
+        JOIN modules ON modules.id = lessons.module_id
+        WHERE comments.material_id = lesson_materials.id
+        """
+    )
+    op.create_index("ix_answers_course_id", "answers", ["course_id"])
+    op.create_index("ix_comments_course_id", "comments", ["course_id"])
+
+    op.create_table(
+        "course_stats_rollup",
+        sa.Column(
+            "course_id",
+            sa.Integer(),
+            sa.ForeignKey("courses.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("total_students", sa.Integer(), nullable=False),
+        sa.Column("completed_students", sa.Integer(), nullable=False),
+        sa.Column("progress_sum", sa.Float(), nullable=False),
+        sa.Column("answers_count", sa.Integer(), nullable=False),
+        sa.Column("scored_answers", sa.Integer(), nullable=False),
+        sa.Column("score_sum", sa.Float(), nullable=False),
+        sa.Column("rebuilt_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "course_daily_stats",
+        sa.Column(
+            "course_id",
+            sa.Integer(),
+            sa.ForeignKey("courses.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("answers_submitted", sa.Integer(), nullable=False),
+        sa.Column("comments_posted", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "course_student_activity",
+        sa.Column(
+            "course_id",
+            sa.Integer(),
+            sa.ForeignKey("courses.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "student_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("last_answer_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("message", sa.String(), nullable=False),
+        sa.Column("notification_type", sa.String(), nullable=False),
+        sa.Column("is_read", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("related_entity_type", sa.String()),
+        sa.Column("related_entity_id", sa.Integer()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_notifications_id", "notifications", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("notifications")
+    op.drop_table("course_student_activity")
+    op.drop_table("course_daily_stats")
+    op.drop_table("course_stats_rollup")
+    op.drop_index("ix_comments_course_id", table_name="comments")
+    op.drop_index("ix_answers_course_id", table_name="answers")
+    op.drop_column("comments", "course_id")
+    op.drop_column("answers", "course_id")
+    op.drop_column("answers", "version")
+    op.drop_column("courses", "structure_version")
+    op.drop_column("courses", "version")
@@ -0,0 +1,74 @@
+"""Composite, partial and unique indexes for hot lookups
+
+Indexes on the large tables are built CONCURRENTLY so writes keep going.
+The unique constraints fail if duplicate enrollments or certificates
+already exist; remove the duplicates first.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, extra create_index kwargs)
+CONCURRENT_INDEXES = [
+    ("ix_answers_task_id_student_id", "answers", ["task_id", "student_id"], {}),
+    ("ix_answers_student_id_course_id", "answers", ["student_id", "course_id"], {}),
+    ("ix_answers_created_at", "answers", ["created_at"], {}),
+    ("ix_comments_material_id_id", "comments", ["material_id", "id"], {}),
+    ("ix_notifications_user_id_id", "notifications", ["user_id", "id"], {}),
+    (
+        "ix_notifications_unread_user_id_id",
+        "notifications",
+        ["user_id", "id"],
+        {"postgresql_where": sa.text("NOT is_read")},
+    ),
+]
+
+FOREIGN_KEY_INDEXES = [
+    ("ix_modules_course_id", "modules", ["course_id"]),
+    ("ix_lessons_module_id", "lessons", ["module_id"]),
+    ("ix_lesson_materials_lesson_id", "lesson_materials", ["lesson_id"]),
+    ("ix_tasks_lesson_id", "tasks", ["lesson_id"]),
+]
+
+UNIQUE_CONSTRAINTS = [
+    ("uq_enrollments_user_id_course_id", "enrollments", ["user_id", "course_id"]),
+    ("uq_certificates_user_id_course_id", "certificates", ["user_id", "course_id"]),
+    ("uq_course_teachers_course_id_teacher_id", "course_teachers", ["course_id", "teacher_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in FOREIGN_KEY_INDEXES:
+        op.create_index(name, table, columns)
+    for name, table, columns in UNIQUE_CONSTRAINTS:
+        op.create_unique_constraint(name, table, columns)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in CONCURRENT_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(CONCURRENT_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    for name, table, _ in reversed(UNIQUE_CONSTRAINTS):
+        op.drop_constraint(name, table, type_="unique")
+    for name, table, _ in reversed(FOREIGN_KEY_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,34 @@
+"""Token revocations for stateless authentication
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "token_revocations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("jti", sa.String()),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        sa.Column("revoked_before", sa.DateTime(timezone=True)),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("jti", name="uq_token_revocations_jti"),
+    )
+    op.create_index("ix_token_revocations_id", "token_revocations", ["id"])
+    op.create_index("ix_token_revocations_expires_at", "token_revocations", ["expires_at"])
+    op.create_index("ix_token_revocations_created_at", "token_revocations", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("token_revocations")
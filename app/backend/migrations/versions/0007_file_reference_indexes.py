@@ -0,0 +1,36 @@
+"""Indexes for the file path lookups of blob references
+
+Built CONCURRENTLY so writes keep going.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# (name, table, column)
+CONCURRENT_INDEXES = [
+    ("ix_lesson_materials_file_path", "lesson_materials", "file_path"),
+    ("ix_answers_file_path", "answers", "file_path"),
+    ("ix_users_profile_image_path", "users", "profile_image_path"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, column in CONCURRENT_INDEXES:
+            op.create_index(
+                name, table, [column], postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(CONCURRENT_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -16,15 +16,20 @@ class Course(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     creator_id = Column(Integer, ForeignKey("users.id"))
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # optimistic locking
+    structure_version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on outline changes
     
     creator = relationship("User", back_populates="courses_created")
-    modules = relationship("Module", back_populates="course", cascade="all, delete-orphan")
+    modules = relationship("Module", back_populates="course", cascade="all, delete-orphan", order_by="Module.order")
     enrollments = relationship("Enrollment", back_populates="course", cascade="all, delete-orphan")
     teachers = relationship("CourseTeacher", back_populates="course", cascade="all, delete-orphan")
 
 
 class CourseTeacher(Base):
     __tablename__ = "course_teachers"
+    __table_args__ = (
+        UniqueConstraint("course_id", "teacher_id", name="uq_course_teachers_course_id_teacher_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"))
@@ -40,11 +45,11 @@ class Module(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
     description = Column(String)
-    course_id = Column(Integer, ForeignKey("courses.id"))
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
     order = Column(Integer)
     
     course = relationship("Course", back_populates="modules")
-    lessons = relationship("Lesson", back_populates="module", cascade="all, delete-orphan")
+    lessons = relationship("Lesson", back_populates="module", cascade="all, delete-orphan", order_by="Lesson.order")
 
 
 class Lesson(Base):
@@ -53,22 +58,22 @@ class Lesson(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
     description = Column(String)
-    module_id = Column(Integer, ForeignKey("modules.id"))
+    module_id = Column(Integer, ForeignKey("modules.id"), index=True)
     order = Column(Integer)
     
     module = relationship("Module", back_populates="lessons")
-    materials = relationship("LessonMaterial", back_populates="lesson", cascade="all, delete-orphan")
-    tasks = relationship("Task", back_populates="lesson", cascade="all, delete-orphan")
+    materials = relationship("LessonMaterial", back_populates="lesson", cascade="all, delete-orphan", order_by="LessonMaterial.order")
+    tasks = relationship("Task", back_populates="lesson", cascade="all, delete-orphan", order_by="Task.order")
 
 
 class LessonMaterial(Base):
     __tablename__ = "lesson_materials"
 
     id = Column(Integer, primary_key=True, index=True)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"))
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), index=True)
     content = Column(String)
     material_type = Column(String)  # text, video, pdf, etc.
-    file_path = Column(String)
+    file_path = Column(String, index=True)
     order = Column(Integer)
     
     lesson = relationship("Lesson", back_populates="materials")
@@ -79,7 +84,7 @@ class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"))
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), index=True)
     title = Column(String)
     description = Column(String)
     task_type = Column(String)  # test, text, file_upload
@@ -92,17 +97,25 @@ class Task(Base):
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        Index("ix_answers_task_id_student_id", "task_id", "student_id"),
+        Index("ix_answers_student_id_course_id", "student_id", "course_id"),
+        Index("ix_answers_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"))
+    # Denormalized from task -> lesson -> module, set by crud.answer and kept in sync on moves
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
     student_id = Column(Integer, ForeignKey("users.id"))
     content = Column(String)
-    file_path = Column(String)
+    file_path = Column(String, index=True)
     score = Column(Float)
     teacher_id = Column(Integer, ForeignKey("users.id"))
     feedback = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # optimistic locking
     
     task = relationship("Task", back_populates="answers")
     student = relationship("User", back_populates="answers", foreign_keys=[student_id])
@@ -111,9 +124,15 @@ class Answer(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Comment lists filter by material and page over id
+        Index("ix_comments_material_id_id", "material_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     material_id = Column(Integer, ForeignKey("lesson_materials.id"))
+    # Denormalized from material -> lesson -> module, set by crud.comment and kept in sync on moves
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
     author_id = Column(Integer, ForeignKey("users.id"))
     content = Column(String)
     reply_to_id = Column(Integer, ForeignKey("comments.id"))
@@ -128,6 +147,9 @@ class Comment(Base):
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    __table_args__ = (
+        UniqueConstraint("user_id", "course_id", name="uq_enrollments_user_id_course_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -142,6 +164,9 @@ class Enrollment(Base):
 
 class Certificate(Base):
     __tablename__ = "certificates"
+    __table_args__ = (
+        UniqueConstraint("user_id", "course_id", name="uq_certificates_user_id_course_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -0,0 +1,30 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class FileBlob(Base):
+    """Content-addressed upload, shared by every row whose file_path points at it."""
+
+    __tablename__ = "file_blobs"
+
+    path = Column(String, primary_key=True)  # blobs/<sha[:2]>/<sha[2:4]>/<sha><ext>
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UploadSession(Base):
+    """Resumable upload in progress, the data so far lives in UPLOAD_DIR/tmp/sessions/<id>.part."""
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    received = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
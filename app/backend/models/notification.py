@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, text
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class Notification(Base):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        Index(
+            "ix_notifications_unread_user_id_id",
+            "user_id",
+            "id",
+            postgresql_where=text("NOT is_read"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    notification_type = Column(String, nullable=False)
+    is_read = Column(Boolean, nullable=False, default=False)
+    related_entity_type = Column(String)
+    related_entity_id = Column(Integer)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    user = relationship("User")
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, DateTime, Date, ForeignKey, Float
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class CourseStatsRollup(Base):
+    __tablename__ = "course_stats_rollup"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    total_students = Column(Integer, nullable=False, default=0)
+    completed_students = Column(Integer, nullable=False, default=0)  # progress >= 80
+    progress_sum = Column(Float, nullable=False, default=0.0)
+    answers_count = Column(Integer, nullable=False, default=0)
+    scored_answers = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    rebuilt_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CourseDailyStats(Base):
+    __tablename__ = "course_daily_stats"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    answers_submitted = Column(Integer, nullable=False, default=0)
+    comments_posted = Column(Integer, nullable=False, default=0)
+
+
+class CourseStudentActivity(Base):
+    __tablename__ = "course_student_activity"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_answer_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -28,7 +28,7 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     role = Column(Enum(UserRole), default=UserRole.STUDENT)
-    profile_image_path = Column(String)
+    profile_image_path = Column(String, index=True)
     
     courses_created = relationship("Course", back_populates="creator")
     courses_enrolled = relationship("Enrollment", back_populates="student")
@@ -39,6 +39,23 @@ class User(Base):
     teacher_courses = relationship("CourseTeacher", back_populates="teacher")
 
 
+class TokenRevocation(Base):
+    """Revoked token id, or all tokens of a user issued before revoked_before."""
+
+    __tablename__ = "token_revocations"
+    __table_args__ = (
+        # Consuming a refresh token inserts its jti, a second attempt conflicts
+        UniqueConstraint("jti", name="uq_token_revocations_jti"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    revoked_before = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
 class TeacherProfile(Base):
     __tablename__ = "teacher_profiles"
     
@@ -15,6 +15,11 @@ class ResponseSchema(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -22,5 +27,6 @@ class TokenData(BaseModel):
 
 
 class PaginatedResponse(GenericModel, Generic[T]):
-    total: int
+    total: Optional[int] = None
     items: list[T]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., max_length=255)
+    size: int = Field(..., gt=0)
+
+
+class UploadSessionOut(BaseModel):
+    id: str
+    filename: str
+    size: int
+    received: int
+    expires_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class StoredFileOut(BaseModel):
+    file_path: str
+    size: int
+    sha256: str
+
+
+class DirectUploadCreate(BaseModel):
+    filename: str = Field(..., max_length=255)
+    size: int = Field(..., gt=0)
+    sha256: str = Field(..., regex="^[0-9a-f]{64}$")
+
+
+class DirectUploadOut(BaseModel):
+    file_path: str
+    upload_url: Optional[str] = None  # None when the content is already stored
+    headers: Dict[str, str] = {}
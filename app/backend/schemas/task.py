@@ -49,10 +49,12 @@ class AnswerCreate(AnswerBase):
 class AnswerUpdate(BaseModel):
     content: Optional[str] = None
     file_path: Optional[str] = None
+    version: int  # version the client read, stale writes get 409
 
 class AnswerGrade(BaseModel):
     score: float = Field(..., ge=0)
     feedback: Optional[str] = None
+    version: int  # version the client read, stale writes get 409
 
 class AnswerInDB(AnswerBase):
     id: int
@@ -62,6 +64,7 @@ class AnswerInDB(AnswerBase):
     teacher_id: Optional[int] = None
     feedback: Optional[str] = None
     is_correct: Optional[bool] = None
+    version: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -1,10 +1,13 @@
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.core.storage import storage
 from app.crud.certificate import certificate as crud_certificate
 from app.crud.enrollment import enrollment as crud_enrollment
 from app.models.course import Course
@@ -35,14 +38,17 @@ async def check_and_generate_certificate(
         "score": f"{enrollment.progress:.0f}%",
     }
     
-    # Ensure certificates directory exists
-    cert_dir = Path(settings.CERTIFICATES_DIR)
-    cert_dir.mkdir(parents=True, exist_ok=True)
+    # Render into the staging directory, then hand the file to the storage backend
+    tmp_dir = Path(settings.UPLOAD_DIR) / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_dir / f"{uuid.uuid4()}.pdf"
     
-    filename = f"certificate_{user.id}_{course.id}.pdf"
-    filepath = str(cert_dir / filename)
-    
-    generate_pdf_certificate(cert_data, filepath)
+    filepath = f"certificates/certificate_{user.id}_{course.id}.pdf"
+    try:
+        await run_in_threadpool(generate_pdf_certificate, cert_data, str(tmp_path))
+        await storage.save(filepath, tmp_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
     
     # Save certificate record to DB
     await crud_certificate.create(db, obj_in={
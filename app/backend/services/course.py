@@ -1,15 +1,91 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.cache import LRUCache, SharedCache
+from app.core.config import settings
 
-from app.crud.course import course as crud_course
+from app.crud.course import course as crud_course, progress_of
 from app.crud.enrollment import enrollment as crud_enrollment
-from app.crud.task import task as crud_task
-from app.crud.answer import answer as crud_answer
-from app.models.course import Course
+from app.crud.statistics import stats_rollup
+from app.models.course import Answer, Course, Enrollment
 from app.models.user import User
 
+outline_cache = LRUCache(
+    "course_outline", max_size=settings.OUTLINE_CACHE_SIZE, ttl=settings.OUTLINE_CACHE_TTL
+)
+shared_outline_cache = SharedCache("course_outline", ttl=settings.OUTLINE_CACHE_TTL)
+
+
+def _columns(obj, exclude: tuple = ()) -> Dict[str, Any]:
+    return {
+        column.key: getattr(obj, column.key)
+        for column in obj.__table__.columns
+        if column.key not in exclude
+    }
+
+
+def _build_outline(course: Course) -> Dict[str, Any]:
+    outline = _columns(course)
+    outline["creator"] = (
+        _columns(course.creator, exclude=("password_hash", "email", "phone"))
+        if course.creator else None
+    )
+    outline["teacher_ids"] = [link.teacher_id for link in course.teachers]
+    outline["modules"] = [
+        {
+            **_columns(module),
+            "lessons": [
+                {
+                    **_columns(lesson),
+                    "materials": [_columns(material) for material in lesson.materials],
+                    "tasks": [_columns(task) for task in lesson.tasks],
+                }
+                for lesson in module.lessons
+            ],
+        }
+        for module in course.modules
+    ]
+    return jsonable_encoder(outline)
+
 
 class CourseService:
+    async def get_course_outline(
+        self,
+        db: AsyncSession,
+        course_id: int,
+        structure_version: Optional[int] = None,
+        creator_updated_at: Optional[datetime] = None,
+    ) -> Optional[Dict[str, Any]]:
+        # Outline is cached per structure version and creator update time,
+        # so writes never need explicit invalidation
+        if structure_version is None:
+            version_info = await crud_course.get_version_info(db, id=course_id)
+            if not version_info:
+                return None
+            structure_version, creator_updated_at, _ = version_info
+
+        creator_version = creator_updated_at.timestamp() if creator_updated_at else 0
+        key = (course_id, structure_version, creator_version)
+        outline = outline_cache.get(key)
+        if outline is not None:
+            return outline
+
+        shared_key = f"{course_id}:{structure_version}:{creator_version}"
+        outline = await shared_outline_cache.get(shared_key)
+        if outline is None:
+            course = await crud_course.get_with_details(db, id=course_id)
+            if not course:
+                return None
+            outline = _build_outline(course)
+            await shared_outline_cache.set(shared_key, outline)
+        outline_cache.set(key, outline)
+        return outline
+
     async def enroll_user(
         self,
         db: AsyncSession,
@@ -35,17 +111,18 @@ class CourseService:
         db: AsyncSession,
         course_id: int,
         user_id: int,
-    ) -> Optional[Course]:
-        course = await crud_course.get_with_details(db, id=course_id)
-        if not course:
+    ) -> Optional[Dict[str, Any]]:
+        outline = await self.get_course_outline(db, course_id)
+        if not outline:
             return None
         
-        # Get user's progress
+        # Get user's progress, the cached outline is shared so copy before adding it
+        course = dict(outline)
         enrollment = await crud_enrollment.get_by_user_and_course(
             db, user_id=user_id, course_id=course_id
         )
         if enrollment:
-            course.user_progress = enrollment.progress
+            course["user_progress"] = enrollment.progress
         
         return course
 
@@ -55,31 +132,39 @@ class CourseService:
         user_id: int,
         course_id: int,
     ) -> float:
-        # Get all tasks in course
-        tasks = await crud_task.get_by_course(db, course_id=course_id)
-        if not tasks:
-            return 0.0
-        
-        # Get user's answers
-        answers = await crud_answer.get_by_user_and_course(
-            db, user_id=user_id, course_id=course_id
+        # Both sums are computed in the database, enrollment is updated in the same statement
+        user_score = (
+            select(func.coalesce(func.sum(Answer.score), 0.0))
+            .filter(Answer.student_id == user_id, Answer.course_id == course_id)
+            .scalar_subquery()
         )
-        
-        # Calculate progress
-        total_score = sum(task.max_score for task in tasks)
-        if total_score == 0:
-            return 0.0
-        
-        user_score = sum(answer.score for answer in answers if answer.score is not None)
-        progress = (user_score / total_score) * 100
-        
-        # Update enrollment
-        enrollment = await crud_enrollment.get_by_user_and_course(
-            db, user_id=user_id, course_id=course_id
+        progress = progress_of(user_score, course_id)
+        # Locked, otherwise a concurrent grade commits between this read and the
+        # UPDATE and old.progress is stale, skewing the rollup deltas
+        old = (
+            select(Enrollment.id, Enrollment.progress)
+            .filter(Enrollment.user_id == user_id, Enrollment.course_id == course_id)
+            .with_for_update()
+            .subquery()
         )
-        if enrollment:
-            await crud_enrollment.update(
-                db, db_obj=enrollment, obj_in={"progress": progress}
-            )
-        
-        return progress
\ No newline at end of file
+        result = await db.execute(
+            update(Enrollment)
+            .where(Enrollment.id == old.c.id)
+            .values(progress=progress)
+            .returning(old.c.progress, Enrollment.progress)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+        if row is None:
+            # Not enrolled, nothing to store
+            return (await db.execute(select(progress))).scalar_one()
+
+        old_progress, new_progress = row
+        await stats_rollup.record_enrollment(
+            db,
+            course_id=course_id,
+            old_progress=old_progress or 0.0,
+            new_progress=new_progress,
+        )
+        await db.commit()
+        return new_progress
@@ -1,10 +1,31 @@
+import asyncio
+import logging
 import os
+import posixpath
 import uuid
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 
 from app.core.config import settings
+from app.core.database import async_session
+from app.core.storage import storage
+from app.crud.file import file_blob as crud_file_blob, upload_session as crud_upload_session
+from app.models.file import UploadSession
+from app.models.user import User
+from app.utils.file_utils import (
+    FileLockedError,
+    FileTooLargeError,
+    SavedFile,
+    hash_file,
+    open_locked,
+    stream_upload_file,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class FileService:
@@ -16,54 +37,273 @@ class FileService:
             ".mp4", ".mov", ".avi",  # Videos
             ".mp3", ".wav",  # Audio
         }
-        self.max_file_size = 10 * 1024 * 1024  # 10MB
+        self.max_file_size = settings.MAX_FILE_SIZE
+
+    @staticmethod
+    def blob_path(sha256: str, file_ext: str) -> str:
+        # Sharded so no directory grows past a few thousand entries
+        return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{file_ext}"
 
     async def save_upload_file(
-        self, upload_file: UploadFile, subdir: str = ""
-    ) -> Tuple[Optional[str], Optional[str]]:
+        self, db: AsyncSession, upload_file: UploadFile
+    ) -> Tuple[Optional[SavedFile], Optional[str]]:
         # Validate file extension
         file_ext = os.path.splitext(upload_file.filename)[1].lower()
         if file_ext not in self.allowed_extensions:
             return None, "File type not allowed"
         
-        # Validate file size
-        if upload_file.size > self.max_file_size:
+        # Validate file size, the reported size is only a hint, the limit is enforced while streaming
+        if upload_file.size is not None and upload_file.size > self.max_file_size:
             return None, "File size exceeds maximum allowed size"
         
-        # Create upload directory if not exists
-        upload_path = self.upload_dir / subdir
-        upload_path.mkdir(parents=True, exist_ok=True)
-        
-        # Generate unique filename
-        file_uuid = str(uuid.uuid4())
-        filename = f"{file_uuid}{file_ext}"
-        file_path = upload_path / filename
+        # Stream into a temporary file first, the content hash names the blob
+        tmp_dir = self.upload_dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f"{uuid.uuid4()}{file_ext}"
+        try:
+            saved = await stream_upload_file(upload_file, tmp_path, max_size=self.max_file_size)
+        except FileTooLargeError as e:
+            return None, str(e)
+        except Exception:
+            return None, "Failed to save file"
         
-        # Save file
+        return await self._store_blob(db, tmp_path, saved, file_ext)
+
+    async def _store_blob(
+        self, db: AsyncSession, tmp_path: Path, saved: SavedFile, file_ext: str
+    ) -> Tuple[Optional[SavedFile], Optional[str]]:
+        # Identical content is stored once, the rows attaching the path reference it
+        relative_path = self.blob_path(saved.sha256, file_ext)
         try:
-            with file_path.open("wb") as buffer:
-                content = await upload_file.read()
-                buffer.write(content)
+            await crud_file_blob.register(
+                db, path=relative_path, sha256=saved.sha256, size=saved.size
+            )
+            if await storage.exists(relative_path):
+                tmp_path.unlink()
+            else:
+                await storage.save(relative_path, tmp_path)
+            await db.commit()
         except Exception:
+            await db.rollback()
+            tmp_path.unlink(missing_ok=True)
             return None, "Failed to save file"
         
-        return str(file_path.relative_to(self.upload_dir)), None
+        return saved._replace(path=relative_path), None
+
+    async def create_direct_upload(
+        self, user: User, filename: str, size: int, sha256: str
+    ) -> Tuple[Optional[str], Optional[Tuple[str, Dict[str, str]]], Optional[str]]:
+        """Presign an upload straight to the storage backend.
+
+        Returns the file path, the presigned (url, headers) or None when the
+        content is already stored, and an error.
+        """
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in self.allowed_extensions:
+            return None, None, "File type not allowed"
+        if size > self.max_upload_size(user):
+            return None, None, "File size exceeds maximum allowed size"
+        
+        relative_path = self.blob_path(sha256, file_ext)
+        if await storage.exists(relative_path):
+            return relative_path, None, None
+        presigned = storage.presigned_put_url(relative_path, size, sha256)
+        if presigned is None:
+            return None, None, "Direct uploads are not supported by the storage backend"
+        return relative_path, presigned, None
+
+    async def complete_direct_upload(
+        self, db: AsyncSession, filename: str, size: int, sha256: str
+    ) -> Tuple[Optional[SavedFile], Optional[str]]:
+        # The key is derived from the claimed hash, so the stored object must prove it
+        # before it is shared as that content
+        relative_path = self.blob_path(sha256, os.path.splitext(filename)[1].lower())
+        if await storage.size(relative_path) != size:
+            return None, "Upload not found"
+        if await storage.checksum_sha256(relative_path) != sha256:
+            if not await crud_file_blob.exists(db, path=relative_path):
+                await storage.delete(relative_path)
+            return None, "Upload checksum does not match"
+        await crud_file_blob.register(db, path=relative_path, sha256=sha256, size=size)
+        await db.commit()
+        return SavedFile(path=relative_path, size=size, sha256=sha256), None
+
+    def max_upload_size(self, user: User) -> int:
+        # Lesson videos routinely exceed the general limit
+        if user.role in ["teacher", "admin"]:
+            return settings.TEACHER_MAX_FILE_SIZE
+        return self.max_file_size
+
+    def session_path(self, session_id: str) -> Path:
+        return self.upload_dir / "tmp" / "sessions" / f"{session_id}.part"
+
+    async def create_upload_session(
+        self, db: AsyncSession, user: User, filename: str, size: int
+    ) -> Tuple[Optional[UploadSession], Optional[str]]:
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in self.allowed_extensions:
+            return None, "File type not allowed"
+        if size > self.max_upload_size(user):
+            return None, "File size exceeds maximum allowed size"
+        
+        session_id = uuid.uuid4().hex
+        path = self.session_path(session_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        session = await crud_upload_session.create(
+            db,
+            id=session_id,
+            user_id=user.id,
+            filename=filename,
+            size=size,
+            ttl=settings.RESUMABLE_UPLOAD_TTL,
+        )
+        return session, None
+
+    async def write_upload_chunk(
+        self, db: AsyncSession, session: UploadSession, offset: int, stream: AsyncIterator[bytes]
+    ) -> Optional[int]:
+        """Write a request body at the given offset, returns the new offset.
+
+        None when the session is no longer at that offset, expired or vanished.
+        Bytes that arrived before a client disconnect are kept, so the client
+        resumes from wherever the stored offset ends up.
+        """
+        try:
+            file = await run_in_threadpool(open_locked, self.session_path(session.id))
+        except FileNotFoundError:
+            return None
+        try:
+            # Writes and the expiry sweep all hold the file lock, the offset read under it is current
+            received = await crud_upload_session.get_received(db, id=session.id)
+            await db.commit()
+            if received is None or received != offset:
+                return None
+            limit = min(session.size - received, settings.RESUMABLE_CHUNK_MAX_SIZE)
+            await run_in_threadpool(file.seek, received)
+            written = 0
+            try:
+                async for chunk in stream:
+                    written += len(chunk)
+                    if written > limit:
+                        raise FileTooLargeError(
+                            "Chunk exceeds the remaining upload size or the chunk size limit"
+                        )
+                    await run_in_threadpool(file.write, chunk)
+            except ClientDisconnect:
+                pass
+            new_received = await crud_upload_session.advance(
+                db,
+                id=session.id,
+                received=received,
+                new_received=received + written,
+                ttl=settings.RESUMABLE_UPLOAD_TTL,
+            )
+            await db.commit()
+            if new_received is not None:
+                # Drop leftovers of an earlier attempt past the new offset
+                await run_in_threadpool(file.truncate)
+        finally:
+            await run_in_threadpool(file.close)
+        return new_received
+
+    async def complete_upload_session(
+        self, db: AsyncSession, session: UploadSession
+    ) -> Tuple[Optional[SavedFile], Optional[str]]:
+        if session.received != session.size:
+            return None, "Upload is incomplete"
+        path = self.session_path(session.id)
+        saved = await hash_file(path)
+        await crud_upload_session.remove(db, id=session.id)
+        return await self._store_blob(db, path, saved, os.path.splitext(session.filename)[1].lower())
+
+    async def abort_upload_session(self, db: AsyncSession, session: UploadSession) -> None:
+        await crud_upload_session.remove(db, id=session.id)
+        await db.commit()
+        self.session_path(session.id).unlink(missing_ok=True)
+
+    async def expire_upload_sessions(self, db: AsyncSession) -> int:
+        # Under the file lock, so a chunk being written keeps its part file and extends the session
+        expired = 0
+        for session_id in await crud_upload_session.get_expired(db):
+            path = self.session_path(session_id)
+            try:
+                file = await run_in_threadpool(open_locked, path)
+            except FileLockedError:
+                continue
+            except FileNotFoundError:
+                file = None
+            try:
+                if await crud_upload_session.remove_expired(db, id=session_id):
+                    await db.commit()
+                    path.unlink(missing_ok=True)
+                    expired += 1
+                else:
+                    await db.commit()
+            finally:
+                if file is not None:
+                    await run_in_threadpool(file.close)
+        return expired
+
+    @staticmethod
+    def normalize_key(relative_path: str) -> Optional[str]:
+        # None for keys outside the uploads: absolute, escaping the root, certificates or staging files
+        key = posixpath.normpath(relative_path)
+        if key.startswith("/") or key == "." or ".." in key.split("/"):
+            return None
+        if key.startswith(("certificates/", "tmp/")):
+            return None
+        return key
+
+    async def is_servable(self, db: AsyncSession, key: str) -> bool:
+        # Registered blobs, plus files stored before deduplication that rows still point at
+        return await crud_file_blob.exists(db, path=key) or await crud_file_blob.is_referenced(
+            db, path=key
+        )
 
     def get_file_path(self, relative_path: str) -> Optional[Path]:
-        file_path = self.upload_dir / relative_path
-        if file_path.exists() and file_path.is_file():
-            return file_path
-        return None
+        return storage.local_path(relative_path)
+
+    async def delete_file(self, db: AsyncSession, relative_path: str) -> Tuple[bool, Optional[str]]:
+        # Files a lesson material, answer or profile still points at are kept
+        await crud_file_blob.lock(db, [relative_path])
+        if await crud_file_blob.is_referenced(db, path=relative_path):
+            await db.rollback()
+            return False, "File is still in use"
+        await crud_file_blob.remove(db, path=relative_path)
+        await db.commit()
+        return await self.remove_stored_files(db, [relative_path]) > 0, None
+
+    async def remove_stored_files(self, db: AsyncSession, paths: List[str]) -> int:
+        """Delete the files of blob rows removed in an already committed transaction.
 
-    def delete_file(self, relative_path: str) -> bool:
-        file_path = self.upload_dir / relative_path
+        Each file goes under its blob lock, paths uploaded again in the meantime
+        are registered anew and kept.
+        """
+        removed = 0
+        for path in paths:
+            await crud_file_blob.lock(db, [path])
+            if not await crud_file_blob.exists(db, path=path) and await self.remove_stored_file(path):
+                removed += 1
+            await db.commit()
+        return removed
+
+    async def remove_stored_file(self, relative_path: str) -> bool:
         try:
-            if file_path.exists():
-                file_path.unlink()
-                return True
-            return False
+            return await storage.delete(relative_path)
         except Exception:
+            logger.exception("Deleting %s from storage failed", relative_path)
             return False
 
 
-file_service = FileService()
\ No newline at end of file
+file_service = FileService()
+
+
+async def expire_upload_sessions_forever() -> None:
+    while True:
+        try:
+            async with async_session() as db:
+                await file_service.expire_upload_sessions(db)
+        except Exception:
+            logger.exception("Expiring upload sessions failed")
+        await asyncio.sleep(settings.RESUMABLE_UPLOAD_CLEANUP_INTERVAL)
\ No newline at end of file
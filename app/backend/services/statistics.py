@@ -0,0 +1,58 @@
+from typing import Any, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import read_session
+from app.crud.statistics import statistics as crud_statistics
+from app.schemas.statistics import CourseStatistics
+
+stats_cache = TTLCache("statistics", max_size=settings.STATS_CACHE_SIZE)
+
+
+async def _with_session(method, **kwargs):
+    # Results are shared between requests, so compute them on a session of their own
+    async with read_session() as db:
+        return await method(db, **kwargs)
+
+
+class StatisticsService:
+    async def get_course_stats(self, course_id: int) -> CourseStatistics:
+        return await stats_cache.get_or_compute(
+            ("course", course_id),
+            lambda: _with_session(crud_statistics.get_course_stats, course_id=course_id),
+            ttl=settings.STATS_COURSE_TTL,
+            stale_ttl=settings.STATS_STALE_TTL,
+        )
+
+    async def get_course_progress(self, course_id: int) -> Dict[str, Any]:
+        return await stats_cache.get_or_compute(
+            ("progress", course_id),
+            lambda: _with_session(crud_statistics.get_course_progress, course_id=course_id),
+            ttl=settings.STATS_PROGRESS_TTL,
+            stale_ttl=settings.STATS_STALE_TTL,
+        )
+
+    async def get_course_activity(self, course_id: int) -> Dict[str, Any]:
+        return await stats_cache.get_or_compute(
+            ("activity", course_id),
+            lambda: _with_session(crud_statistics.get_course_activity, course_id=course_id),
+            ttl=settings.STATS_ACTIVITY_TTL,
+            stale_ttl=settings.STATS_STALE_TTL,
+        )
+
+    async def get_system_stats(self) -> Dict[str, Any]:
+        return await stats_cache.get_or_compute(
+            ("system",),
+            lambda: _with_session(crud_statistics.get_system_stats),
+            ttl=settings.STATS_SYSTEM_TTL,
+            stale_ttl=settings.STATS_STALE_TTL,
+        )
+
+    # Admin reports are rare and expected to be current, so they are not cached
+    async def get_user_activity_report(self, db: AsyncSession, days: int = 30) -> List[Dict[str, Any]]:
+        return await crud_statistics.get_user_activity_report(db, days=days)
+
+    async def get_courses_report(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        return await crud_statistics.get_courses_report(db)
@@ -0,0 +1,225 @@
+import mimetypes
+import os
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.utils.http_cache import is_not_modified, make_etag
+
+# More ranges than this in one request are answered with the whole file
+MAX_RANGES = 16
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Byte ranges of a Range header as sorted, merged (start, end) pairs, end inclusive.
+
+    None means the header is malformed and must be ignored, an empty list that
+    nothing in it is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        if not dash:
+            return None
+        try:
+            if not first:
+                # Suffix range, the last N bytes
+                length = int(last)
+                if length > 0 and size > 0:
+                    ranges.append((max(size - length, 0), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        if start < size:
+            ranges.append((start, size - 1 if end is None else min(end, size - 1)))
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _if_range_matches(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_range = request.headers.get("If-Range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return if_range == etag
+    try:
+        since = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    return since == last_modified.replace(microsecond=0)
+
+
+class FileRangesResponse(Response):
+    """Sends byte ranges of a file, with sendfile when the server offers zero-copy send."""
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: Path,
+        parts: List[Tuple[bytes, int, int]],
+        trailer: bytes = b"",
+        status_code: int = status.HTTP_200_OK,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: Optional[str] = None,
+    ):
+        # parts are (bytes sent before the range, start, end inclusive)
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.parts = parts
+        self.trailer = trailer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zero_copy = "http.response.zerocopysend" in scope.get("extensions", {})
+        file = await run_in_threadpool(open, self.path, "rb")
+        try:
+            for prefix, start, end in self.parts:
+                if prefix:
+                    await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                if zero_copy:
+                    await send(
+                        {
+                            "type": "http.response.zerocopysend",
+                            "file": file,
+                            "offset": start,
+                            "count": end - start + 1,
+                            "more_body": True,
+                        }
+                    )
+                    continue
+                offset = start
+                while offset <= end:
+                    chunk = await run_in_threadpool(
+                        os.pread, file.fileno(), min(self.chunk_size, end - offset + 1), offset
+                    )
+                    if not chunk:
+                        break
+                    offset += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": self.trailer, "more_body": False})
+        finally:
+            await run_in_threadpool(file.close)
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    *,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+    accel_uri: Optional[str] = None,
+) -> Response:
+    """Download response with strong ETag, conditional GET and single/multi Range support.
+
+    With FILE_ACCEL_MODE set and accel_uri given, only headers are returned and
+    the front proxy sends the file (and handles ranges) itself.
+    """
+    stat = os.stat(path)
+    filename = filename or path.name
+    media_type = media_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    # Stored files are replaced, never rewritten in place, so inode/size/mtime identify the content
+    etag = make_etag(stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    last_modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+    }
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if settings.FILE_ACCEL_MODE == "x-accel-redirect" and accel_uri:
+        headers["X-Accel-Redirect"] = accel_uri
+        return Response(headers=headers, media_type=media_type)
+    if settings.FILE_ACCEL_MODE == "x-sendfile":
+        headers["X-Sendfile"] = str(path.resolve())
+        return Response(headers=headers, media_type=media_type)
+
+    size = stat.st_size
+    range_header = request.headers.get("Range")
+    ranges = None
+    if range_header and _if_range_matches(request, etag, last_modified):
+        ranges = parse_range(range_header, size)
+
+    if ranges is None:
+        headers["Content-Length"] = str(size)
+        return FileRangesResponse(
+            path, [(b"", 0, size - 1)] if size else [], headers=headers, media_type=media_type
+        )
+    if not ranges:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}", "ETag": etag},
+        )
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return FileRangesResponse(
+            path,
+            [(b"", start, end)],
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            headers=headers,
+            media_type=media_type,
+        )
+
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            (
+                f"\r\n--{boundary}\r\nContent-Type: {media_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+            ).encode(),
+            start,
+            end,
+        )
+        for start, end in ranges
+    ]
+    trailer = f"\r\n--{boundary}--\r\n".encode()
+    length = sum(len(prefix) + end - start + 1 for prefix, start, end in parts) + len(trailer)
+    headers["Content-Length"] = str(length)
+    return FileRangesResponse(
+        path,
+        parts,
+        trailer,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        headers=headers,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+    )
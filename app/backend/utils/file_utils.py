@@ -1,19 +1,150 @@
+import fcntl
+import hashlib
 import os
 from pathlib import Path
-from fastapi import UploadFile
-from typing import Optional
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import NamedTuple, Optional
 
+from app.core.config import settings
 
-async def save_upload_file(upload_file: UploadFile, destination: Path) -> Optional[str]:
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class FileTooLargeError(ValueError):
+    pass
+
+
+class FileLockedError(RuntimeError):
+    pass
+
+
+class SavedFile(NamedTuple):
+    path: Path
+    size: int
+    sha256: str
+
+
+def _write_chunk(buffer, hasher, chunk: bytes) -> None:
+    buffer.write(chunk)
+    hasher.update(chunk)
+
+
+async def stream_upload_file(
+    upload_file: UploadFile,
+    destination: Path,
+    max_size: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> SavedFile:
+    # Copies the upload in fixed-size chunks, file I/O and hashing run in the thread pool.
+    # The data lands in a temporary file that is renamed into place once complete.
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    part_path = destination.with_name(f".{destination.name}.part")
+    hasher = hashlib.sha256()
+    size = 0
+    buffer = await run_in_threadpool(part_path.open, "wb")
     try:
-        with destination.open("wb") as buffer:
-            content = await upload_file.read()
-            buffer.write(content)
+        while chunk := await upload_file.read(chunk_size):
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise FileTooLargeError("File size exceeds maximum allowed size")
+            await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.replace, part_path, destination)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(part_path.unlink, missing_ok=True)
+        raise
+    return SavedFile(destination, size, hasher.hexdigest())
+
+
+def open_locked(path: Path):
+    # Exclusive advisory lock, shared by every worker on the host, released on close
+    file = path.open("r+b")
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        file.close()
+        raise FileLockedError("File is being written by another request")
+    return file
+
+
+def _hash_file(path: Path, chunk_size: int) -> SavedFile:
+    hasher = hashlib.sha256()
+    size = 0
+    with path.open("rb") as file:
+        while chunk := file.read(chunk_size):
+            size += len(chunk)
+            hasher.update(chunk)
+    return SavedFile(path, size, hasher.hexdigest())
+
+
+async def hash_file(path: Path) -> SavedFile:
+    return await run_in_threadpool(_hash_file, path, settings.UPLOAD_CHUNK_SIZE)
+
+
+async def save_upload_file(
+    upload_file: UploadFile, destination: Path, max_size: Optional[int] = None
+) -> Optional[str]:
+    try:
+        await stream_upload_file(upload_file, destination, max_size=max_size)
         return str(destination)
     except Exception:
         return None
 
 
+class UploadSizeLimitMiddleware:
+    """Refuse multipart bodies over MAX_FILE_SIZE, they are spooled before any endpoint code runs.
+
+    A declared Content-Length is checked up front. Chunked bodies declare none,
+    so their bytes are counted as the app reads them and reading fails with 413
+    at the limit.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: Optional[int] = None):
+        self.app = app
+        self.limit = (max_size or settings.MAX_FILE_SIZE) + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.limit:
+            response = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": "File size exceeds maximum allowed size"},
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    # Raised inside the body parser, FastAPI passes HTTPException through as is
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File size exceeds maximum allowed size",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
 def ensure_directory_exists(path: str) -> bool:
     try:
         Path(path).mkdir(parents=True, exist_ok=True)